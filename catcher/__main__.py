@@ -1,7 +1,9 @@
 """Catcher - Microservices automated test tool.
 
 Usage:
-  catcher [-i INVENTORY] <tests> [-l LEVEL] [-e VARS...] [-m MODS...]... [-r RES] [-p FORMAT] [-s SYS_ENV] [-f FILTER]... [--q | --qq] [--no-color]
+  catcher [-i INVENTORY] <tests> [-l LEVEL] [-e VARS...] [-m MODS...]... [-r RES] [-p FORMAT] [-s SYS_ENV] [-f FILTER]... [-j JOBS] [-x EXCLUDE]... [--last-steps N] [--variables-delta] [--q | --qq] [--no-color] [--no-cache]
+  catcher bench [-i INVENTORY] <tests> [-n ITERATIONS | -d DURATION] [-c USERS] [--rps RPS] [-o REPORT] [-l LEVEL] [-e VARS...] [-m MODS...]... [-r RES] [-s SYS_ENV] [-f FILTER]... [--no-color] [--no-cache]
+  catcher report <report> [-p FORMAT] [-l LEVEL] [-m MODS...]... [-r RES] [-f FILTER]... [--no-color]
   catcher -v | --version
   catcher -h | --help
 
@@ -14,14 +16,29 @@ Options:
   -s SYS_ENV --system_env SYS-ENV    use system environment variables as variables [default: true]
   -m MODULES --modules MODULES       specify directories or python packages to search for external modules
   -r RESOURCES --resources RESOURCES set the resources dir [default: ./resources]
-  -p FORMAT --format FORMAT          set the format (json/html) for the resulting file, which includes all steps
+  -p FORMAT --format FORMAT          set the format (json/html/jsonl) for the resulting file, which includes all steps
                                      execution results, variables and outputs. It is created in the `reports` directory.
-                                     Is not created by default.
+                                     Is not created by default. jsonl report is written during the run, event by event.
+                                     Run `catcher report <jsonl report>` to build html report from it.
   -f FILTER --filter FILTER          Path to python file with custom filters implementation or python module's path if
                                      installed in the system.
+  -j JOBS --jobs JOBS                run test files in parallel using JOBS worker processes [default: 1]
+  -x EXCLUDE --exclude EXCLUDE       glob pattern of test files or directories to skip (f.e. 'steps/*' or '*_draft.yml')
+  --last-steps N                     show N last steps of every failed test in the summary (if report format is not
+                                     set) [default: 0]
+  --variables-delta                  store only variables changed since the previous step in the report instead of all
+                                     variables for every step.
   --q                                Do not print steps output
   --qq                               Do not print steps and tests output
   --no-color                         Do not use colorful output.
+  --no-cache                         Do not cache parsed tests in the user's cache directory (~/.cache/catcher).
+
+Bench options (run a test file many times and report latency statistics):
+  -n ITERATIONS --iterations ITERATIONS  total number of test runs (by all users). Default is one per user.
+  -d DURATION --duration DURATION        run test again and again for DURATION seconds
+  -c USERS --users USERS                 number of virtual users running the test at the same time [default: 1]
+  --rps RPS                              max number of test runs started per second (by all users)
+  -o REPORT --output REPORT              write statistics as json to REPORT file
 """
 import os
 import sys
@@ -30,7 +47,14 @@ from distutils.util import strtobool
 from docopt import docopt, DocoptExit
 
 from catcher import APPVSN
+from catcher.core import bench
+from catcher.core.filters_factory import FiltersFactory
+from catcher.core.mod_factory import ModulesFactory
+from catcher.core.parser import user_cache_dir
 from catcher.core.runner import Runner
+from catcher.core.step_factory import StepFactory
+from catcher.modules.formatter import formatter_factory
+from catcher.modules.log_storage import read_report
 from catcher.utils import logger
 from catcher.utils.logger import warning
 from catcher.utils.module_utils import load_external_actions
@@ -47,7 +71,12 @@ def main(args=None):
         sys.exit(1)
     path = os.getcwd()
     logger.configure(arguments['--log-level'], not arguments['--no-color'])
-    result = run_tests(path, arguments)
+    if arguments['bench']:
+        result = run_bench(path, arguments)
+    elif arguments['report']:
+        result = build_report(path, arguments)
+    else:
+        result = run_tests(path, arguments)
     if result:
         sys.exit(0)
     else:
@@ -55,6 +84,42 @@ def main(args=None):
 
 
 def run_tests(path: str, arguments: dict):
+    output = 'full' if not arguments['--q'] else 'limited'
+    if arguments['--qq']:
+        output = 'final'
+    runner = __create_runner(path, arguments)
+    return runner.run_tests(output=output)
+
+
+def run_bench(path: str, arguments: dict):
+    runner = __create_runner(path, arguments)
+    return bench.run_bench(runner,
+                           iterations=int(arguments['--iterations']) if arguments['--iterations'] else None,
+                           duration=float(arguments['--duration']) if arguments['--duration'] else None,
+                           users=int(arguments['--users']),
+                           rps=float(arguments['--rps']) if arguments['--rps'] else None,
+                           report=arguments['--output'])
+
+
+def build_report(path: str, arguments: dict):
+    """
+    Build report in FORMAT (html by default) from the jsonl report. It is created in the jsonl report's directory.
+    """
+    report = os.path.abspath(arguments['<report>'])
+    modules = arguments['--modules']
+    __load_modules(modules)
+    ModulesFactory(resources_dir=arguments['--resources'] or os.path.join(path, 'resources'))
+    FiltersFactory(custom_modules=list(arguments['--filter'] or []))
+    StepFactory(modules)
+    formatter_factory(arguments['--format'] or 'html').format(os.path.dirname(report), '',
+                                                               read_report(report),
+                                                               StepFactory().modules,
+                                                               ModulesFactory().modules,
+                                                               FiltersFactory())
+    return True
+
+
+def __create_runner(path: str, arguments: dict) -> Runner:
     file_or_dir = arguments['<tests>']
     inventory = arguments['--inventory']
     environment = arguments['--environment']
@@ -63,22 +128,28 @@ def run_tests(path: str, arguments: dict):
     output_format = arguments['--format']
     filters = arguments['--filter']
     use_sys_vars = arguments['--system_env']
-    output = 'full' if not arguments['--q'] else 'limited'
-    if arguments['--qq']:
-        output = 'final'
+    jobs = int(arguments['--jobs'])
+    exclude = arguments['--exclude']
+    last_steps = int(arguments['--last-steps'])
+    variables_delta = arguments['--variables-delta']
+    cache_dir = None if arguments['--no-cache'] else user_cache_dir()
     if strtobool(use_sys_vars):
         sys_vars = dict(os.environ)
     else:
         sys_vars = None
     __load_modules(modules)
-    runner = Runner(path, file_or_dir, inventory,
-                    modules=modules,
-                    cmd_env=__env_to_variables(environment),
-                    resources=resources,
-                    system_environment=sys_vars,
-                    output_format=output_format,
-                    filter_list=filters)
-    return runner.run_tests(output=output)
+    return Runner(path, file_or_dir, inventory,
+                  modules=modules,
+                  cmd_env=__env_to_variables(environment),
+                  resources=resources,
+                  system_environment=sys_vars,
+                  output_format=output_format,
+                  filter_list=filters,
+                  jobs=jobs,
+                  cache_dir=cache_dir,
+                  exclude_files=exclude,
+                  last_steps=last_steps,
+                  variables_delta=variables_delta)
 
 
 def __env_to_variables(environment: list) -> dict:
@@ -0,0 +1,234 @@
+import asyncio
+import copy
+import json
+import math
+import os
+import time
+import traceback
+from typing import Optional
+
+from catcher.core.runner import Runner
+from catcher.core.mod_factory import ModulesFactory
+from catcher.core.scope import Scope
+from catcher.core.test import Test
+from catcher.modules.log_storage import SilentLogStorage
+from catcher.utils import logger
+from catcher.steps.http import Http
+from catcher.utils.async_utils import run_sync, thread_pool
+from catcher.utils.file_utils import cut_path, ensure_dir
+from catcher.utils.logger import debug, warning, OptionalOutput
+
+PERCENTILES = [50, 90, 99]
+
+
+class BenchStats:
+    """
+    Latencies and errors of bench iterations and their steps.
+    """
+
+    def __init__(self) -> None:
+        self.iterations = []  # seconds
+        self.failed = 0
+        self.setup_errors = []  # (user, error) for users, whose includes failed, so they run no iterations
+        self.steps = {}  # step name -> list of seconds
+        self.step_errors = {}  # step name -> number of failures
+        self.elapsed = 0
+
+    def add_step(self, name: str, seconds: float, success: bool):
+        self.steps.setdefault(name, []).append(seconds)
+        if not success:
+            self.step_errors[name] = self.step_errors.get(name, 0) + 1
+
+    def add_iteration(self, seconds: float, success: bool):
+        self.iterations.append(seconds)
+        if not success:
+            self.failed += 1
+
+    def add_setup_error(self, user: int, error: Exception):
+        self.setup_errors.append((user, error))
+
+    def summary(self) -> dict:
+        total = len(self.iterations)
+        return {'iterations': total,
+                'failed': self.failed,
+                'setup_failed': len(self.setup_errors),
+                'error_rate': self.failed / total if total else 0,
+                'elapsed': self.elapsed,
+                'throughput': total / self.elapsed if self.elapsed else 0,
+                'latency': latency_summary(self.iterations),
+                'steps': {name: {**latency_summary(latencies),
+                                 'count': len(latencies),
+                                 'errors': self.step_errors.get(name, 0),
+                                 'error_rate': self.step_errors.get(name, 0) / len(latencies)}
+                          for name, latencies in self.steps.items()}}
+
+
+class Bench:
+    """
+    Run a test file many times by several virtual users at the same time and collect latency statistics of each
+    iteration and each step.
+
+    Every virtual user runs test's includes once and then test's steps (one iteration) and it's finally block
+    again and again, till `iterations` are run or `duration` seconds pass. Each user has it's own variables (with
+    **USER** number) and every iteration starts from them (with **ITERATION** number), so users and iterations
+    don't see each other's registered variables. With `rps` iterations are started not more often than rps times per
+    second in total.
+    Every user has it's own steps and http sessions (cookies).
+    Virtual users are coroutines in the same event loop, so steps with async actions scale best. Sync steps are run
+    in a pool of `users` threads.
+    Steps are identified by their names in statistics, so name steps of the same type to tell them apart.
+    """
+
+    def __init__(self, runner: Runner, iterations: Optional[int] = None, duration: Optional[float] = None,
+                 users: int = 1, rps: Optional[float] = None) -> None:
+        self.runner = runner
+        self.users = max(users, 1)
+        self.iterations = iterations if iterations is not None or duration is not None else self.users
+        self.duration = duration
+        self.rps = rps
+        self._started = 0
+        self._start_time = None
+
+    def run(self) -> BenchStats:
+        log_storage, logger.log_storage = logger.log_storage, SilentLogStorage('empty')
+        try:
+            [mod.before() for mod in ModulesFactory().modules.values()]  # f.e. install requirements before parsing
+            parse_result = self.runner.parser.read_test_file(self.runner.tests_path)
+            if not parse_result.should_run:
+                raise Exception('Can\'t parse {}: {}'.format(parse_result.test, parse_result.parse_error))
+            with OptionalOutput(True):
+                stats = run_sync(self._run_users(parse_result))
+            for user, error in stats.setup_errors:
+                warning('User {} includes failed: {}', user, error)
+            return stats
+        finally:
+            logger.log_storage = log_storage
+            [mod.after() for mod in ModulesFactory().modules.values()]
+
+    async def _run_users(self, parse_result) -> BenchStats:
+        stats = BenchStats()
+        self._started = 0
+        self._start_time = time.monotonic()
+        with thread_pool(self.users):  # every user can run a sync step at the same time
+            await asyncio.gather(*[self._run_user(user, parse_result, stats) for user in range(self.users)])
+        stats.elapsed = time.monotonic() - self._start_time
+        return stats
+
+    async def _run_user(self, user: int, parse_result, stats: BenchStats):
+        Http.own_sessions()
+        test = _copy_test(parse_result.test)
+        variables = self.runner.var_holder.variables
+        variables['TEST_NAME'] = parse_result.test.file
+        variables['USER'] = user
+        try:
+            for include in parse_result.run_on_include:
+                include = _copy_test(include)
+                self.runner.var_holder.prepare_variables(include, variables)
+                await include.run_async()
+        except Exception as e:
+            debug(lambda: traceback.format_exc())
+            stats.add_setup_error(user, e)
+            return
+        iteration = self._next_iteration()
+        while iteration is not None:
+            if self.rps:
+                await asyncio.sleep(self._start_time + iteration / self.rps - time.monotonic())
+            await self._run_iteration(iteration, test, variables, stats)
+            iteration = self._next_iteration()
+
+    async def _run_iteration(self, iteration: int, test: Test, variables: Scope, stats: BenchStats):
+        test = copy.copy(test)  # user's iterations are run one by one, so they share it's steps
+        test.step_listener = stats.add_step
+        iteration_variables = Scope(variables)
+        iteration_variables['ITERATION'] = iteration
+        self.runner.var_holder.prepare_variables(test, iteration_variables)
+        started = time.perf_counter()
+        try:
+            await test.run_async()
+            result = True
+        except Exception as e:
+            debug('Iteration {} failed: {}', iteration, e)
+            debug(lambda: traceback.format_exc())
+            result = False
+        stats.add_iteration(time.perf_counter() - started, result)
+        if test.final:
+            try:
+                await test.run_finally_async(result)
+            except Exception as e:
+                debug('Iteration {} cleanup failed: {}', iteration, e)
+
+    def _next_iteration(self) -> Optional[int]:
+        """
+        Number of the next iteration to run or None if it's time to stop.
+        Users are coroutines of the same thread, so no synchronization is needed.
+        """
+        if self.iterations is not None and self._started >= self.iterations:
+            return None
+        if self.duration is not None:
+            next_start = self._start_time + self._started / self.rps if self.rps else time.monotonic()
+            if max(next_start, time.monotonic()) - self._start_time >= self.duration:
+                return None
+        self._started += 1
+        return self._started - 1
+
+
+def latency_summary(latencies: list) -> dict:
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+    summary = {'p{}'.format(p): ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)] for p in PERCENTILES}
+    summary['max'] = ordered[-1]
+    summary['mean'] = sum(ordered) / len(ordered)
+    return summary
+
+
+def print_stats(stats: dict, test_path: str):
+    """
+    Print bench statistics as a table: a row per step and the total one per iteration.
+    """
+    columns = ['count', 'errors'] + ['p{}'.format(p) for p in PERCENTILES] + ['max']
+    rows = [(name, step) for name, step in stats['steps'].items()]
+    rows.append(('iteration', {**stats['latency'], 'count': stats['iterations'], 'errors': stats['failed']}))
+    width = max([len(name) for name, _ in rows])
+    out_string = 'Bench {}. Iterations: {}, Failed: {}, Error rate: {:.2%}, Throughput: {:.2f}/s, Elapsed: {:.2f}s\n' \
+        .format(logger.blue(test_path),
+                stats['iterations'],
+                (logger.red if stats['failed'] else logger.green)(str(stats['failed'])),
+                stats['error_rate'],
+                stats['throughput'],
+                stats['elapsed'])
+    if stats['setup_failed']:
+        out_string += 'Users with failed includes: {}\n'.format(logger.red(str(stats['setup_failed'])))
+    out_string += ' ' * width + ''.join(['{:>10}'.format(c) for c in columns])
+    for name, row in rows:
+        out_string += '\n' + name.ljust(width)
+        out_string += ''.join(['{:>10}'.format(row.get(c, 0)) if c in ('count', 'errors')
+                               else '{:>8.1f}ms'.format(row.get(c, 0) * 1000) for c in columns])
+    logger.info(out_string)
+
+
+def run_bench(runner: Runner, iterations: Optional[int] = None, duration: Optional[float] = None, users: int = 1,
+              rps: Optional[float] = None, report: Optional[str] = None) -> bool:
+    """
+    Run the bench, print it's statistics and write them as json to the report file, if set.
+    Return true if some iterations were run and none of them (and no user's includes) failed.
+    """
+    stats = Bench(runner, iterations=iterations, duration=duration, users=users, rps=rps).run().summary()
+    print_stats(stats, cut_path(runner.path, runner.tests_path))
+    if report:
+        ensure_dir(os.path.dirname(os.path.abspath(report)))
+        with open(report, 'w') as f:
+            json.dump(stats, f, indent=2)
+    return stats['iterations'] > 0 and stats['failed'] == 0 and stats['setup_failed'] == 0
+
+
+def _copy_test(test: Test) -> Test:
+    """
+    Copy of the test for one virtual user with it's own steps (compiled again, as steps can keep state, f.e.
+    connections), variables and includes.
+    """
+    copied = copy.copy(test)
+    copied.compile()
+    if test.includes:
+        copied.includes = {alias: _copy_test(include) for alias, include in test.includes.items()}
+    return copied
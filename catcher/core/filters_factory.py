@@ -1,3 +1,6 @@
+from jinja2 import Environment
+from jinja2.nativetypes import NativeEnvironment
+
 from catcher.utils import module_utils
 from catcher.utils.singleton import Singleton
 from catcher.utils.logger import info, debug
@@ -8,6 +11,8 @@ class FiltersFactory(metaclass=Singleton):
         super().__init__()
         self._filters = {}
         self._functions = {}
+        self._environment = None
+        self._native_environment = None
         if not custom_modules:
             custom_modules = []
         custom_modules.append('catcher.modules.filter_impl.bifs')
@@ -21,6 +26,30 @@ class FiltersFactory(metaclass=Singleton):
     def functions(self):
         return self._functions
 
+    @property
+    def environment(self) -> Environment:
+        """
+        Jinja environment with all filters and functions registered. Is built once and shared by all templates.
+        """
+        if self._environment is None:
+            environment = Environment()
+            environment.filters.update(self._filters)
+            environment.globals.update(self._functions)
+            self._environment = environment
+        return self._environment
+
+    @property
+    def native_environment(self) -> NativeEnvironment:
+        """
+        Same as environment, but templates are rendered to python objects instead of strings.
+        """
+        if self._native_environment is None:
+            environment = NativeEnvironment()
+            environment.filters.update(self._filters)
+            environment.globals.update(self._functions)
+            self._native_environment = environment
+        return self._native_environment
+
     def _import_custom(self, custom_modules):
         """
         Will import all functions started with name 'function_' to global functions and all functions started with
@@ -34,9 +63,9 @@ class FiltersFactory(metaclass=Singleton):
             for fun_name, fun in funs.items():
                 if fun_name.startswith('function'):
                     import_name = '_'.join(fun_name.split('_')[1:])
-                    debug('Adding function {}'.format(import_name))
+                    debug('Adding function {}', import_name)
                     self._functions[import_name] = fun
                 elif fun_name.startswith('filter'):
                     import_name = '_'.join(fun_name.split('_')[1:])
-                    debug('Adding filter {}'.format(import_name))
+                    debug('Adding filter {}', import_name)
                     self._filters[import_name] = fun
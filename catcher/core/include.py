@@ -1,12 +1,39 @@
 import os
 
-import networkx as nx
-
 from typing import Tuple, Optional, Union, List
 
 from catcher.utils.logger import debug
 
 
+class IncludeChain:
+    """
+    Chain of files, included one by one from the test down to the include being read now.
+    Includes are read depth-first, so any circular dependency will lead to the file, which is already in the
+    chain. Check costs O(1) per include instead of searching for cycles in the whole includes graph.
+    """
+
+    def __init__(self, root: str) -> None:
+        self._chain = [root]
+        self._files = {os.path.normpath(root)}
+
+    def push(self, file: str):
+        self._chain.append(file)
+        self._files.add(os.path.normpath(file))
+
+    def pop(self):
+        self._files.discard(os.path.normpath(self._chain.pop()))
+
+    def cycle(self, file: str) -> Optional[List[str]]:
+        """
+        Cycle, which will appear if file is included by the last file in chain. None if there is no cycle.
+        """
+        key = os.path.normpath(file)
+        if key not in self._files:
+            return None
+        start = [os.path.normpath(f) for f in self._chain].index(key)
+        return self._chain[start:] + [file]
+
+
 class Include:
     """
     Include another testcase in include section:
@@ -16,6 +43,9 @@ class Include:
     - alias: unique name to run this test later
     - run_on_include: should run as soon as included (before test)
     - ignore_errors: should continue running other tests if this fails
+    - scope: `test` (default) runs include for every test, which includes it. `run` runs include only once per
+      run (per worker in a parallel run) for the same variables and reuses variables it registered. Such include
+      sees only inventory, command line and system variables and it's own `variables`, not the test's ones
 
     :Examples:
 
@@ -40,6 +70,13 @@ class Include:
             - file: long_form.yaml
               variables: {user_email: 'override@email.org'}
 
+    Register user once for all tests in the run, which include this file with the same variables
+    ::
+
+        include:
+            file: register_user.yaml
+            scope: run
+
     Include with alias and run later
     ::
 
@@ -56,32 +93,35 @@ class Include:
     """
 
     def __init__(self, ignore_errors=False, file=None, **kwargs) -> None:
-        if 'file' is None:
+        if file is None:
             raise RuntimeError('Can\'t include unknown file.')
         self.file = file
         self.variables = kwargs.get('variables', {})
         self.alias = kwargs.get('as', None)
         self.run_on_include = kwargs.get('run_on_include', self.alias is None)
         self.ignore_errors = ignore_errors
+        self.scope = kwargs.get('scope', 'test')
+        if self.scope not in ('test', 'run'):
+            raise RuntimeError('Unknown include scope {} for {}. Use test or run.'.format(self.scope, file))
 
     @staticmethod
     def check_circular(parent: str,
-                       all_includes: nx.DiGraph,
+                       all_includes: IncludeChain,
                        current_include: dict) -> 'Include':
         path = current_include['file']
-        all_includes.add_edge(parent, path)
-        if list(nx.simple_cycles(all_includes)):
-            debug(str(all_includes.edges))
-            raise Exception('Circular dependencies for ' + path)
+        cycle = all_includes.cycle(path)
+        if cycle is not None:
+            debug('Include {} from {} creates a cycle', path, parent)
+            raise Exception('Circular dependencies for {}: {}'.format(path, ' -> '.join(cycle)))
         return Include(**current_include)
 
     @staticmethod
     def read_includes(path: str,
                       parent: str,
                       includes: Union[dict, list, str],
-                      all_includes: Optional[nx.DiGraph]) -> Tuple[nx.DiGraph, List['Include']]:
+                      all_includes: Optional[IncludeChain]) -> Tuple[IncludeChain, List['Include']]:
         if all_includes is None:
-            all_includes = nx.DiGraph()
+            all_includes = IncludeChain(parent)
         if isinstance(includes, str) or isinstance(includes, dict):  # single include
             raw = [Include.read_include(path, parent, includes, all_includes)]
         elif isinstance(includes, list):  # an array of includes
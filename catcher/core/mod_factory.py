@@ -14,7 +14,7 @@ class ModulesFactory(metaclass=Singleton):
         # TODO find all submodules of catcher.modules.Module dynamically!
         self._modules = {'compose': DockerCompose(kwargs['resources_dir']),
                          'requirements': Requirements(kwargs['resources_dir'])}
-        debug('Loaded modules: {}'.format(list(self._modules.keys())))
+        debug('Loaded modules: {}', list(self._modules.keys()))
 
     @property
     def modules(self):
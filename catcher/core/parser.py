@@ -1,8 +1,15 @@
-from typing import Optional, List
+import datetime
+import hashlib
+import json
+import os
+import pickle
+from typing import Optional, List, Iterator
 
+import catcher
 from catcher.core.include import Include
 from catcher.core.test import Test
-from catcher.utils.file_utils import read_source_file, get_filename, get_files
+from catcher.utils.file_utils import read_source_file, get_filename, iter_files, parse_source, ensure_dir
+from catcher.utils.logger import debug
 
 
 class ParseResult:
@@ -17,11 +24,124 @@ class ParseResult:
         return self.parse_error is None
 
 
+def user_cache_dir() -> str:
+    """
+    Per-user cache directory: $XDG_CACHE_HOME/catcher or ~/.cache/catcher
+    """
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'catcher')
+
+
+class ParseCache:
+    """
+    Cache of parsed test files. Files parsed during the run are memoized (includes are read for every test, which
+    includes them). If cache directory is set - parsed files are also stored there as json and are reused between
+    runs. Files, which can't be stored as json without changes (f.e. with not string keys), are not stored.
+    Cache entry is valid while file's modification time and size are the same, or, if they've changed, while it's
+    content hash is the same.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None) -> None:
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._memo = {}
+
+    def read(self, file: str) -> dict:
+        """
+        Parsed file body. Is a new object every time, so it can be modified.
+        """
+        if not os.path.exists(file):
+            raise FileNotFoundError('No such file: ' + file)
+        stat = os.stat(file)
+        key = (file, stat.st_mtime_ns, stat.st_size)
+        parsed = self._memo.get(key)
+        if parsed is None:
+            parsed = pickle.dumps(self._read_cached(file, stat))  # in memory only, never loaded from the disk
+            self._memo[key] = parsed
+        else:
+            self.hits += 1
+        return pickle.loads(parsed)
+
+    def _read_cached(self, file: str, stat):
+        entry_file = None
+        entry = None
+        if self.cache_dir is not None:
+            entry_file = os.path.join(self.cache_dir,
+                                      hashlib.sha1(os.path.abspath(file).encode('utf-8')).hexdigest() + '.json')
+            entry = self._load_entry(entry_file)
+            if entry is not None and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                self.hits += 1
+                return entry['body']
+        with open(file, 'rb') as f:
+            content = f.read()
+        content_hash = hashlib.sha1(content).hexdigest()
+        if entry is not None and entry['hash'] == content_hash:  # file was touched, but not changed
+            self.hits += 1
+            body = entry['body']
+        else:
+            self.misses += 1
+            body = parse_source(file, content.decode('utf-8'))
+        if entry_file is not None:
+            self._save_entry(entry_file, {'version': catcher.APPVSN,
+                                          'mtime': stat.st_mtime_ns,
+                                          'size': stat.st_size,
+                                          'hash': content_hash,
+                                          'body': body})
+        return body
+
+    @staticmethod
+    def _load_entry(entry_file: str) -> Optional[dict]:
+        try:
+            with open(entry_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f, object_hook=_decode_value)
+            if isinstance(entry, dict) and entry.get('version') == catcher.APPVSN \
+                    and isinstance(entry.get('mtime'), int) and isinstance(entry.get('size'), int) \
+                    and isinstance(entry.get('hash'), str) and 'body' in entry:
+                return entry
+        except Exception:  # no entry or it is broken - it will be overwritten
+            pass
+        return None
+
+    def _save_entry(self, entry_file: str, entry: dict):
+        try:
+            content = json.dumps(entry, default=_encode_value)
+            if json.loads(content, object_hook=_decode_value) != entry:  # f.e. not string keys
+                debug('Parsed test can\'t be cached as json: {}', entry_file)
+                return
+            ensure_dir(self.cache_dir)
+            tmp_file = '{}.{}.tmp'.format(entry_file, os.getpid())
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_file, entry_file)  # atomic, as several processes can write the same entry
+        except (OSError, TypeError, ValueError) as e:
+            debug('Can\'t save parse cache entry: {}', e)
+
+
+def _encode_value(value):
+    """
+    Dates and times, which yaml can parse, are stored as tagged strings.
+    """
+    if isinstance(value, datetime.datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'__date__': value.isoformat()}
+    raise TypeError('Can\'t cache {}'.format(type(value).__name__))
+
+
+def _decode_value(obj: dict):
+    if len(obj) == 1 and '__datetime__' in obj:
+        return datetime.datetime.fromisoformat(obj['__datetime__'])
+    if len(obj) == 1 and '__date__' in obj:
+        return datetime.date.fromisoformat(obj['__date__'])
+    return obj
+
+
 class Parser:
 
-    def __init__(self, path: str, inventory_path: Optional[str]) -> None:
+    def __init__(self, path: str, inventory_path: Optional[str], cache_dir: Optional[str] = None) -> None:
         self.path = path
         self.inventory = inventory_path
+        self.cache = ParseCache(cache_dir)
 
     def read_inventory(self) -> dict:
         if self.inventory is not None:
@@ -31,22 +151,25 @@ class Parser:
             return inv_vars
         return {}
 
-    def read_tests(self, test_path: str) -> List[ParseResult]:
+    def read_tests(self, test_path: str, include: Optional[List[str]] = None,
+                   exclude: Optional[List[str]] = None) -> Iterator[ParseResult]:
         """
-        Parse all tests at path, return pairs of (tests run before the test, test)
+        Lazily parse all tests at path, return pairs of (tests run before the test, test).
+        Each test is returned as soon as it is parsed.
         """
-        results = []
-        for test_file in get_files(test_path):
-            try:
-                raw_test = self.read_test(test_file)
-                if raw_test.ignore:  # ignore the test - do not need to check imports (they may be missing)
-                    results += [ParseResult(raw_test, run_on_include=[])]
-                    continue
-                run_on_include = self.fill_includes_recursive(test_file, raw_test, None)
-                results += [ParseResult(raw_test, run_on_include=run_on_include)]
-            except Exception as e:
-                results += [ParseResult(test_file, parse_error=str(e))]
-        return results
+        for test_file in iter_files(test_path, include=include, exclude=exclude):
+            yield self.read_test_file(test_file)
+
+    def read_test_file(self, test_file: str) -> ParseResult:
+        try:
+            raw_test = self.read_test(test_file)
+            if raw_test.ignore:  # ignore the test - do not need to check imports (they may be missing)
+                return ParseResult(raw_test, run_on_include=[])
+            raw_test.compile()  # fail on invalid steps before anything is run
+            run_on_include = self.fill_includes_recursive(test_file, raw_test, None)
+            return ParseResult(raw_test, run_on_include=run_on_include)
+        except Exception as e:
+            return ParseResult(test_file, parse_error=str(e))
 
     def fill_includes_recursive(self, parent, raw_test, all_includes):
         run_on_include = []
@@ -54,16 +177,21 @@ class Parser:
         raw_test.includes = {}  # clear & fill real includes
         for include in raw_includes:
             test = self.read_test(include.file)
+            test.compile()
             test.include = include  # remember include's properties (like ignore_errors)
             if include.alias is not None:
                 raw_test.includes[include.alias] = test
             if include.run_on_include:
                 run_on_include += [test]
-            run_on_include += self.fill_includes_recursive(include.file, test, all_includes)
+            all_includes.push(include.file)
+            try:
+                run_on_include += self.fill_includes_recursive(include.file, test, all_includes)
+            finally:
+                all_includes.pop()
         return run_on_include
 
     def read_test(self, test_file: str):
-        body = read_source_file(test_file)
+        body = self.cache.read(test_file)
         return Test(self.path,
                     test_file,
                     includes=body.get('include', []),
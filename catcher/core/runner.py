@@ -1,18 +1,29 @@
+import copy
+import json
+import logging
 import os
+import sys
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from catcher.core.var_holder import VariablesHolder
 from catcher.core.parser import Parser
+from catcher.core.scope import Scope, changes
 from catcher.core.step_factory import StepFactory
 from catcher.core.test import Test
 from catcher.core.filters_factory import FiltersFactory
-from catcher.modules.log_storage import LogStorage
+from catcher.modules.log_storage import LogStorage, EmptyLogStorage, StreamingLogStorage
 from catcher.steps.step import SkipException
 from catcher.utils import logger
-from catcher.utils.file_utils import cut_path
+from catcher.utils.file_utils import cut_path, iter_files
 from catcher.utils.logger import warning, info, debug, OptionalOutput
+from catcher.utils.misc import template_cache_info, try_get_object, fill_template_str
+from catcher.utils.module_utils import load_external_actions
+from catcher.utils.singleton import Singleton
 from catcher.core.mod_factory import ModulesFactory
 
+_worker_runner = None  # Runner instance of the current worker process (parallel run only)
+
 
 class Runner:
     def __init__(self,
@@ -24,23 +35,46 @@ class Runner:
                  system_environment=None,
                  resources=None,
                  output_format=None,
-                 filter_list=None) -> None:
-        # singletons init should be done before services (like vars holder), as singletons maybe used there
-        # modules should be done before filters, as requirements module installs dependencies for custom bifs
-        ModulesFactory(resources_dir=resources or os.path.join(path, 'resources'))
-        FiltersFactory(custom_modules=filter_list)
-        StepFactory(modules)
-
+                 filter_list=None,
+                 jobs=1,
+                 cache_dir=None,
+                 include_files=None,
+                 exclude_files=None,
+                 last_steps=0,
+                 variables_delta=False) -> None:
+        self.modules = modules
+        self.resources = resources
+        self.filter_list = filter_list
+        self.output_format = output_format
+        self.jobs = jobs or 1
+        self.include_files = include_files
+        self.exclude_files = exclude_files
+        self.last_steps = last_steps
+        self.variables_delta = variables_delta
         self.tests_path = tests_path
         self.path = path
-        self.parser = Parser(path, inventory)
+        self._run_scoped = {}  # (include file, include variables) -> (result, registered variables, deleted)
+        self._init_singletons()
+        self.parser = Parser(path, inventory, cache_dir=cache_dir)
         self.var_holder = VariablesHolder(path,
                                           system_environment=system_environment,
                                           inventory_vars=self.parser.read_inventory(),
                                           cmd_env=cmd_env,
                                           resources=resources)
-        if output_format:
-            logger.log_storage = LogStorage(output_format)
+        if output_format == 'jsonl':
+            logger.log_storage = StreamingLogStorage(output_format, os.path.join(path, 'reports'),
+                                                     variables_delta=variables_delta)
+        elif output_format:
+            logger.log_storage = LogStorage(output_format, variables_delta=variables_delta)
+        else:
+            logger.log_storage = EmptyLogStorage('empty', last_steps=last_steps)
+
+    def _init_singletons(self):
+        # singletons init should be done before services (like vars holder), as singletons maybe used there
+        # modules should be done before filters, as requirements module installs dependencies for custom bifs
+        ModulesFactory(resources_dir=self.resources or os.path.join(self.path, 'resources'))
+        FiltersFactory(custom_modules=list(self.filter_list or []))
+        StepFactory(self.modules)
 
     def run_tests(self, output: str = 'full') -> bool:
         """
@@ -49,22 +83,11 @@ class Runner:
         """
         try:
             [mod.before() for mod in ModulesFactory().modules.values()]
-            results = []
-            for parse_result in self.parser.read_tests(self.tests_path):
-                if parse_result.should_run:  # parse successful
-                    variables = self.var_holder.variables  # each test has it's own copy of global variables
-                    variables['TEST_NAME'] = parse_result.test.file  # variables are shared between test and includes
-                    with OptionalOutput(output == 'final'):
-                        for include in parse_result.run_on_include:  # run all includes before the main test.
-                            self._run_test(include, variables, output=output, test_type='include')
-                        result = self._run_test(parse_result.test, variables, output=output)
-                        results.append(result)
-                        self._run_finally(parse_result.test, result)
-                else:  # parse failed (dependency/parsing problem)
-                    warning('Test ' + cut_path(self.tests_path, parse_result.test) +
-                            logger.red(' failed: ') + str(parse_result.parse_error))
-                    logger.log_storage.test_parse_fail(parse_result.test, parse_result.parse_error)
-                    results.append(False)
+            if self.jobs > 1:
+                results = self._run_parallel(output)
+            else:
+                results = [self._run_parsed(parse_result, output) for parse_result in
+                           self.parser.read_tests(self.tests_path, self.include_files, self.exclude_files)]
             return all(results)
         finally:
             logger.log_storage.write_report(self.path,
@@ -73,8 +96,89 @@ class Runner:
                                             ModulesFactory().modules,
                                             FiltersFactory())
             logger.log_storage.print_summary(self.tests_path)
+            debug('Templates cache: {}', template_cache_info())
+            debug('Parse cache: {} hits, {} misses', self.parser.cache.hits, self.parser.cache.misses)
             [mod.after() for mod in ModulesFactory().modules.values()]
 
+    def _run_parsed(self, parse_result, output: str) -> bool:
+        """
+        Run a single parsed test file: it's run_on_include chain, the test itself and it's finally block.
+        """
+        if parse_result.should_run:  # parse successful
+            variables = self.var_holder.variables  # each test has it's own copy of global variables
+            variables['TEST_NAME'] = parse_result.test.file  # variables are shared between test and includes
+            with OptionalOutput(output == 'final'):
+                for include in parse_result.run_on_include:  # run all includes before the main test.
+                    self._run_include(include, variables, output=output)
+                result = self._run_test(parse_result.test, variables, output=output)
+                self._run_finally(parse_result.test, result)
+            return result
+        # parse failed (dependency/parsing problem)
+        warning('Test ' + cut_path(self.tests_path, parse_result.test) +
+                logger.red(' failed: ') + str(parse_result.parse_error))
+        logger.log_storage.test_parse_fail(parse_result.test, parse_result.parse_error)
+        return False
+
+    def _run_parallel(self, output: str) -> list:
+        """
+        Parse and run test files in a pool of worker processes. Each worker has it's own singletons and log storage.
+        Workers' log storage data is merged back into the main log storage, console output is printed per test.
+        Modules' before/after are run only in the main process.
+        """
+        results = []
+        with ProcessPoolExecutor(max_workers=self.jobs,
+                                 initializer=_init_worker,
+                                 initargs=(self, logging.root.level, logger.colored_output)) as pool:
+            futures = {pool.submit(_run_in_worker, test_file, output): test_file
+                       for test_file in iter_files(self.tests_path, self.include_files, self.exclude_files)}
+            for future in as_completed(futures):
+                try:
+                    result, data, console = future.result()
+                except Exception as e:  # worker crashed or result can't be sent back - other tests are not affected
+                    warning('Test ' + cut_path(self.tests_path, futures[future]) + logger.red(' failed: ') +
+                            'worker error {}: {}'.format(type(e).__name__, e))
+                    logger.log_storage.test_parse_fail(futures[future], 'Worker error: {}'.format(e))
+                    results.append(False)
+                    continue
+                sys.stderr.write(console)
+                logger.log_storage.merge(data)
+                results.append(result)
+        return results
+
+    def _run_include(self, include: Test, variables: Scope, output: str = 'full') -> bool:
+        """
+        Run include before the test. Run-scoped include is run only once for the same variables passed to it,
+        all next times variables it registered are reused. It's inputs are only inventory, command line and system
+        variables and it's own variables, rendered with the test's ones: it doesn't see other test's variables
+        (f.e. registered by previous includes). Failed run-scoped include is run again by the next test.
+        """
+        if include.include is None or include.include.scope != 'run':
+            return self._run_test(include, variables, output=output, test_type='include')
+        include_vars = try_get_object(fill_template_str(include.include.variables, variables))
+        key = (include.file, json.dumps(include_vars, sort_keys=True, default=str))
+        if key in self._run_scoped:
+            registered, deleted = self._run_scoped[key]
+            info('Include ' + cut_path(self.tests_path, include.file) + logger.blue(' reused.'))
+            variables.update(registered)
+            for k in deleted:
+                variables.pop(k, None)
+            return True
+        include = copy.copy(include)  # run with rendered variables, as test's ones are not visible
+        include.include = copy.copy(include.include)
+        include.include.variables = include_vars
+        include_scope = self.var_holder.variables
+        include_scope['TEST_NAME'] = include.file
+        before = include_scope.snapshot()
+        result = self._run_test(include, include_scope, output=output, test_type='include')
+        registered = changes(include_scope, before)
+        deleted = [k for k in before if k not in include_scope]
+        variables.update(registered)
+        for k in deleted:
+            variables.pop(k, None)
+        if result:
+            self._run_scoped[key] = (registered, deleted)
+        return result
+
     def _run_test(self, test: Test, global_variables: dict, output: str = 'full', test_type='test') -> bool:
         try:
             self.var_holder.prepare_variables(test, global_variables)
@@ -92,7 +196,7 @@ class Runner:
         except Exception as e:
             warning(test_type.capitalize() + ' ' + cut_path(self.tests_path, test.file) +
                     logger.red(' failed: ') + str(e))
-            debug(traceback.format_exc())
+            debug(lambda: traceback.format_exc())
             logger.log_storage.test_end(test.file, False, str(e), test_type=test_type)
             return False
 
@@ -106,5 +210,33 @@ class Runner:
             except Exception as e:
                 warning('Test ' + cut_path(self.tests_path, test.file) + ' [cleanup] ' +
                         logger.red(' failed: ') + str(e))
-                debug(traceback.format_exc())
+                debug(lambda: traceback.format_exc())
                 logger.log_storage.test_end(test.file, False, test_type='{} [cleanup]'.format(test.file))
+
+
+def _init_worker(runner: Runner, log_level: int, colored_output: bool):
+    """
+    Worker process initializer. Load steps and (re)create singletons for this process.
+    """
+    global _worker_runner
+    logging.root.setLevel(log_level)
+    logger.colored_output = colored_output
+    load_external_actions('catcher.steps')
+    load_external_actions('catcher_modules')
+    [load_external_actions(m) for m in runner.modules or []]
+    Singleton._instances = {}
+    runner._init_singletons()
+    _worker_runner = runner
+
+
+def _run_in_worker(test_file: str, output: str) -> tuple:
+    """
+    Parse and run one test file in the worker. Return test result, it's log storage data and console output.
+    """
+    if _worker_runner.output_format:
+        logger.log_storage = LogStorage(_worker_runner.output_format, variables_delta=_worker_runner.variables_delta)
+    else:
+        logger.log_storage = EmptyLogStorage('empty', last_steps=_worker_runner.last_steps)
+    with logger.buffered_output() as console:
+        result = _worker_runner._run_parsed(_worker_runner.parser.read_test_file(test_file), output)
+    return result, logger.log_storage.data, console.getvalue()
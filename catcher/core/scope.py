@@ -0,0 +1,166 @@
+from collections.abc import Mapping, MutableMapping
+from typing import Optional
+
+MAX_DEPTH = 16  # flatten scopes chain if it is deeper, to keep lookups fast
+
+_DELETED = object()  # marks variable deleted in this scope, but existing in parent
+
+
+class Scope(MutableMapping):
+    """
+    Copy-on-write variables scope. Reads fall through to the parent scope, while writes and deletes stay in this
+    scope and are never visible to the parent. Creating a child scope (for a test, include, loop iteration or
+    wait attempt) is O(1) instead of copying all variables.
+
+    Only top level keys are copied on write. Values themselves are shared between scopes, so steps should
+    register new values instead of modifying existing ones in place.
+    """
+
+    def __init__(self, parent: Optional[Mapping] = None, local: Optional[dict] = None, frozen=False) -> None:
+        if parent is None:
+            parent = {}
+        if isinstance(parent, Scope) and parent.depth >= MAX_DEPTH:
+            parent = parent.flatten()
+        self._parent = parent
+        self._local = {} if local is None else local
+        self._frozen = frozen  # snapshot's layer, is never changed
+        self._last_snapshot = None
+
+    @property
+    def depth(self) -> int:
+        if isinstance(self._parent, Scope):
+            return self._parent.depth + 1
+        return 1
+
+    @property
+    def changes(self) -> dict:
+        """
+        Variables added or changed in this scope (without the parent's ones). Deleted are not included.
+        """
+        return {k: v for k, v in self._local.items() if v is not _DELETED}
+
+    @property
+    def deleted(self) -> list:
+        """
+        Variables deleted in this scope.
+        """
+        return [k for k, v in self._local.items() if v is _DELETED]
+
+    def child(self) -> 'Scope':
+        """
+        New scope on top of this one. Changes in the child are not visible here.
+        """
+        return Scope(self)
+
+    def snapshot(self) -> 'Scope':
+        """
+        Freeze current state and return it. Costs O(1): current changes become an immutable layer, shared by the
+        snapshot and this scope, and all future changes go to a new layer.
+        Snapshot is isolated from this scope's future changes, but not from the parent's ones.
+        Every snapshot is a child of the previous one, so :func:`changes` between them costs O(changes).
+        """
+        if self._parent is self._last_snapshot and self.depth >= MAX_DEPTH:
+            self._parent._compact()
+        frozen = Scope(self._parent, self._local, frozen=True)
+        self._parent = frozen if frozen.depth < MAX_DEPTH else frozen.flatten()
+        self._local = {}
+        self._last_snapshot = frozen
+        return frozen
+
+    def _compact(self):
+        """
+        Merge layers of the parent snapshots into one to keep lookups fast. Unlike flattening, it doesn't copy
+        variables of the first not frozen parent and keeps this scope's identity.
+        """
+        layers = []
+        parent = self._parent
+        while isinstance(parent, Scope) and parent._frozen:
+            layers.append(parent._local)
+            parent = parent._parent
+        merged = {}
+        for layer in reversed(layers):  # from the bottom one, so that upper layers override
+            merged.update(layer)
+        self._parent = Scope(parent, merged, frozen=True)
+
+    def flatten(self) -> dict:
+        """
+        All visible variables as a plain dict.
+        """
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        if key in self._local:
+            value = self._local[key]
+            if value is _DELETED:
+                raise KeyError(key)
+            return value
+        return self._parent[key]
+
+    def __setitem__(self, key, value) -> None:
+        self._local[key] = value
+
+    def __delitem__(self, key) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._local[key] = _DELETED
+
+    def __contains__(self, key) -> bool:
+        if key in self._local:
+            return self._local[key] is not _DELETED
+        return key in self._parent
+
+    def __iter__(self):
+        for key, value in self._local.items():
+            if value is not _DELETED:
+                yield key
+        for key in self._parent:
+            if key not in self._local:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def copy(self) -> 'Scope':
+        return Scope(self._parent, dict(self._local))
+
+    def __repr__(self) -> str:
+        return repr(self.flatten())
+
+
+def changes(variables: Mapping, base: Mapping) -> dict:
+    """
+    Variables added or changed in variables comparing to base (f.e. registered by the step, run in the child scope).
+    Values are compared by identity, as unchanged ones are shared with the base.
+    If variables is a scope on top of base only it's own layers are checked, which costs O(changes) instead of
+    O(all variables).
+    """
+    layers = _layers_above(variables, base)
+    if layers is None:  # not a child of base (f.e. flattened or replaced by the step)
+        return {k: v for k, v in variables.items() if k not in base or base[k] is not v}
+    local = {}
+    for layer in reversed(layers):  # from the bottom one, so that upper layers override
+        local.update(layer)
+    return {k: v for k, v in local.items() if v is not _DELETED and (k not in base or base[k] is not v)}
+
+
+def removed(variables: Mapping, base: Mapping) -> list:
+    """
+    Variables of base, which are absent in variables. Like :func:`changes` costs O(changes) if variables is a scope
+    on top of base.
+    """
+    layers = _layers_above(variables, base)
+    if layers is None:
+        return [k for k in base if k not in variables]
+    keys = {k for layer in layers for k, v in layer.items() if v is _DELETED}
+    return [k for k in keys if k in base and k not in variables]
+
+
+def _layers_above(variables: Mapping, base: Mapping) -> Optional[list]:
+    """
+    Local layers of scopes between variables and base (from the top one) or None if base is not variables' ancestor.
+    """
+    layers = []
+    while isinstance(variables, Scope) and variables is not base:
+        layers.append(variables._local)
+        variables = variables._parent
+    return layers if variables is base else None
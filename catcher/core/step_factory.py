@@ -47,6 +47,8 @@ class StepFactory(metaclass=Singleton):
 
         if isinstance(body, str):
             body = {'_body': body}
+        else:
+            body = dict(body)  # do not modify the step definition
         body['_get_actions'] = get_actions_fun
         body['_get_action'] = get_action_fun
         body['_path'] = path
@@ -1,12 +1,13 @@
-import time
 import traceback
 from typing import Union
 
 from catcher.steps.step import Step, SkipException
 from catcher.steps.stop import StopException
 from catcher.utils import logger
+from catcher.utils.async_utils import run_sync
 from catcher.utils.logger import debug, info
 from catcher.utils.misc import fill_template_str
+from catcher.utils.time_utils import start_timer, elapsed_ns, format_ns
 from catcher.steps.check import Operator
 from catcher.core.step_factory import StepFactory
 
@@ -58,6 +59,39 @@ class Test:
         self.steps = steps
         self.ignore = ignore
         self.include = None  # if this test is include it will refer to `Include` class
+        self.step_listener = None  # function(action name, seconds, success) called after each step (f.e. for bench)
+        self._steps_plan = None
+        self._final_plan = None
+
+    def compile(self):
+        """
+        Build step objects for all steps and finally actions once. Compiled plan is reused every time the test is
+        run (f.e. include, run many times via `run`). Fails on invalid step definition.
+        """
+        self._steps_plan = self._compile_steps(self.steps)
+        self._final_plan = self._compile_steps(self.final)
+
+    @property
+    def steps_plan(self) -> tuple:
+        if self._steps_plan is None:
+            self.compile()
+        return self._steps_plan
+
+    @property
+    def final_plan(self) -> tuple:
+        if self._final_plan is None:
+            self.compile()
+        return self._final_plan
+
+    def _compile_steps(self, steps: list) -> tuple:
+        return tuple((step, tuple(StepFactory().get_actions(self.path, step))) for step in steps or [])
+
+    def __getstate__(self):
+        # step objects are not sent to other processes, they are compiled there again
+        state = dict(self.__dict__)
+        state['_steps_plan'] = None
+        state['_final_plan'] = None
+        return state
 
     def check_ignored(self):
         if self.ignore:
@@ -67,17 +101,26 @@ class Test:
                 raise SkipException('Test ignored')
 
     def run(self, tag=None, raise_stop=False) -> dict:
-        for step in self.steps:
-            if not self._run_step(step, tag, raise_stop):
+        return run_sync(self.run_async(tag=tag, raise_stop=raise_stop))
+
+    async def run_async(self, tag=None, raise_stop=False) -> dict:
+        """
+        Run test's steps one by one in the event loop.
+        """
+        for step, actions in self.steps_plan:
+            if not await self._run_step(step, actions, tag, raise_stop):
                 break
         return self.variables
 
     def run_finally(self, result: bool):
-        for step in self.final:
-            if not self._run_step(step, result=result):
+        run_sync(self.run_finally_async(result))
+
+    async def run_finally_async(self, result: bool):
+        for step, actions in self.final_plan:
+            if not await self._run_step(step, actions, result=result):
                 return
 
-    def _run_step(self, step, tag=None, raise_stop=False, result=None) -> bool:
+    async def _run_step(self, step, actions, tag=None, raise_stop=False, result=None) -> bool:
         [action] = step.keys()
         ignore_errors = get_or_default('ignore_errors', step[action], False)
         if tag is not None:  # skip if tag specified
@@ -89,48 +132,58 @@ class Test:
             if (not result and run_type == 'pass') or (result and run_type == 'fail'):
                 debug('Skip final action')
                 return True
-        actions = StepFactory().get_actions(self.path, step)
         for action_object in actions:
             # override all variables with cmd variables
-            if not self._run_actions(step, action, action_object, self.variables, raise_stop, ignore_errors):
+            if not await self._run_actions(step, action, action_object, self.variables, raise_stop, ignore_errors):
                 return False
         return True
 
-    def _run_actions(self, step, action, action_object, variables, raise_stop, ignore_errors) -> bool:
+    async def _run_actions(self, step, action, action_object, variables, raise_stop, ignore_errors) -> bool:
         action_name = get_action_name(action, action_object, variables)
-        start = time.process_time()
+        timer = start_timer()
         try:
             logger.log_storage.new_step(step, variables)
             action_object.check_skip(variables)
-            self.variables = action_object.action(self.includes, variables)
+            self.variables = await action_object.run_action_async(self.includes, variables)
             # repeat for run (variables were computed after name)
             action_name = get_action_name(action, action_object, self.variables)
-            info('Step ' + action_name + get_timing(start) + logger.green(' OK'))
-            logger.log_storage.step_end(step, self.variables)
+            timing = elapsed_ns(timer)
+            info('Step ' + action_name + get_timing(timing) + logger.green(' OK'))
+            logger.log_storage.step_end(step, self.variables, timing=timing)
+            self._notify_listener(action_name, timing, True)
             return True
         except StopException as e:  # stop a test without error
+            timing = elapsed_ns(timer)
             if raise_stop:  # or raise error if configured
-                logger.log_storage.step_end(step, variables, success=False, output=str(e))
+                logger.log_storage.step_end(step, variables, success=False, output=str(e), timing=timing)
                 raise e
-            debug('Skip ' + action_name + ' due to ' + str(e))
-            info('Step ' + action_name + get_timing(start) + logger.green(' OK'))
-            logger.log_storage.step_end(step, self.variables, success=True, output=str(e))
+            debug('Skip {} due to {}', action_name, e)
+            info('Step ' + action_name + get_timing(timing) + logger.green(' OK'))
+            logger.log_storage.step_end(step, self.variables, success=True, output=str(e), timing=timing)
+            self._notify_listener(action_name, timing, True)
             return False  # stop current test
         except SkipException as e:  # skip this step
             info('Step ' + action_name + logger.yellow(' skipped'))
-            logger.log_storage.step_end(step, self.variables, success=True, output=str(e))
+            logger.log_storage.step_end(step, self.variables, success=True, output=str(e), timing=elapsed_ns(timer))
             return True
         except Exception as e:
+            timing = elapsed_ns(timer)
             if ignore_errors:  # continue actions & steps execution
-                debug('Step ' + action_name + get_timing(start) + logger.red(' failed') + ', but we ignore it')
-                logger.log_storage.step_end(step, variables, success=True)
+                debug('Step ' + action_name + get_timing(timing) + logger.red(' failed') + ', but we ignore it')
+                logger.log_storage.step_end(step, variables, success=True, timing=timing)
+                self._notify_listener(action_name, timing, True)
                 return True
             else:
-                info('Step ' + action_name + get_timing(start) + logger.red(' failed: ') + str(e))
-                debug(traceback.format_exc())
-                logger.log_storage.step_end(step, variables, success=False, output=str(e))
+                info('Step ' + action_name + get_timing(timing) + logger.red(' failed: ') + str(e))
+                debug(lambda: traceback.format_exc())
+                logger.log_storage.step_end(step, variables, success=False, output=str(e), timing=timing)
+                self._notify_listener(action_name, timing, False)
                 raise e
 
+    def _notify_listener(self, action_name: str, timing: dict, success: bool):
+        if self.step_listener is not None:
+            self.step_listener(action_name, timing['wall_ns'] / 1e9, success)
+
     def __repr__(self) -> str:
         return str(self.steps)
 
@@ -148,8 +201,5 @@ def get_action_name(action_type: str, action: Step, variables: dict):
     return action_type
 
 
-def get_timing(start_time) -> str:
-    delta = time.process_time() - start_time
-    if delta > 60:
-        return ' [{:.0f}m {:.0f}s]'.format(delta / 60, delta - 60 * int(delta / 60))
-    return ' [{:.0f}s]'.format(delta)
+def get_timing(timing: dict) -> str:
+    return ' [{}]'.format(format_ns(timing['wall_ns']))
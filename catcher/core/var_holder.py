@@ -1,7 +1,7 @@
 import os
-from copy import deepcopy
 from typing import Optional
 
+from catcher.core.scope import Scope
 from catcher.utils.logger import debug
 from catcher.utils.misc import try_get_object, fill_template_str, report_override, merge_two_dicts
 
@@ -24,7 +24,7 @@ class VariablesHolder:
                  resources: Optional[dict] = None) -> None:
         system_vars = system_environment or {}
         if system_vars:
-            debug('Use system variables: ' + str(list(system_vars.keys())))
+            debug(lambda: 'Use system variables: ' + str(list(system_vars.keys())))
             self._variables = system_vars
         else:
             self._variables = {}
@@ -35,11 +35,11 @@ class VariablesHolder:
         self._variables['RESOURCES_DIR'] = resources or os.path.join(path, 'resources')
 
     @property
-    def variables(self) -> dict:
+    def variables(self) -> Scope:
         """
-        deep copy of inventory & environment variables
+        copy-on-write scope of inventory & environment variables
         """
-        return deepcopy(self._variables)
+        return Scope(self._variables)
 
     def prepare_variables(self, test, global_variables: dict):
         """
@@ -67,5 +67,5 @@ class VariablesHolder:
             include_vars = {}
         override_keys = report_override(test.variables, include_vars)
         if override_keys:
-            debug('Include variables override these variables: ' + str(override_keys))
+            debug('Include variables override these variables: {}', override_keys)
         return include_vars
@@ -1,9 +1,11 @@
 import base64
 import hashlib
+import importlib
 import random
 import sys
 import datetime
 import time
+from functools import lru_cache
 
 from faker import Faker
 from catcher.utils import module_utils, misc
@@ -133,15 +135,43 @@ def function_random(param, locale=None):
     :param param: Faker's provider name.
     :param locale: Faker's locale param
     """
-    fake = Faker(locale=locale)
-    for modname, importer in module_utils.get_submodules_of('faker.providers'):  # add all known providers
-        fake.add_provider(importer.find_module(modname).load_module(modname))
+    return _get_provider(param, locale)()
+
+
+def function_random_many(param, count, locale=None):
+    """
+    Generate a list of random data, same as calling `random` `count` times. Is useful for seeding data.
+    F.e. ::
+
+        - echo: {from: '{{ random_many("email", 1000) }}', to: emails.output}
+
+    :param param: Faker's provider name.
+    :param count: number of elements to generate.
+    :param locale: Faker's locale param
+    """
+    provider = _get_provider(param, locale)
+    return [provider() for _ in range(int(count))]
+
+
+def _get_provider(param, locale=None):
+    fake = _get_faker(tuple(locale) if isinstance(locale, list) else locale)
     if hasattr(fake, param):
-        return getattr(fake, param)()
+        return getattr(fake, param)
     else:
         raise ValueError('Unknown param to randomize: ' + param)
 
 
+@lru_cache(maxsize=None)
+def _get_faker(locale=None) -> Faker:
+    """
+    Faker with all known providers for the locale. Is created once and reused.
+    """
+    fake = Faker(locale=locale)
+    for modname, _ in module_utils.get_submodules_of('faker.providers'):  # add all known providers
+        fake.add_provider(importlib.import_module(modname))
+    return fake
+
+
 def filter_hash(data, alg='md5'):
     """
     Filter for hashing data.
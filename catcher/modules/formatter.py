@@ -10,6 +10,7 @@ from typing import Union
 import catcher
 from catcher.utils import file_utils
 from catcher.utils.internal_utils import modify_resource, ensure_resource
+from catcher.utils.time_utils import format_ns
 
 
 class Formatter(ABC):
@@ -33,6 +34,9 @@ class HTMLFormatter(Formatter):
     def format(self, path: str, reports: str, data: list, steps, modules, bifs):
         self._dump_system_log(join(path, reports), steps, modules, bifs)
         self._write_static(join(path, reports))
+        for test in data:
+            if test.get('variables_delta') and isinstance(test.get('output'), list):
+                expand_variables(test['output'])
         total_time = 0
         passed = 0
         failed = 0
@@ -47,15 +51,18 @@ class HTMLFormatter(Formatter):
             if test['status'] == 'CRASH':
                 failed += 1
                 continue
-            test_time = time.mktime(time.strptime(test['end_time'], "%Y-%m-%d %H:%M:%S")) - time.mktime(
-                time.strptime(test['start_time'], "%Y-%m-%d %H:%M:%S"))
+            if 'wall_ns' in test:
+                test_time = round((test['wall_ns'] + test.get('cleanup_wall_ns', 0)) / 1e9, 3)
+            else:  # data from previous version
+                test_time = time.mktime(time.strptime(test['end_time'], "%Y-%m-%d %H:%M:%S")) - time.mktime(
+                    time.strptime(test['start_time'], "%Y-%m-%d %H:%M:%S"))
             test['test_time'] = test_time
             total_time += test_time
             self._write_test_yaml(join(path, reports, run_time_dir), test)
             self._write_test(join(path, reports, run_time_dir), test)
         modify_resource('index.html',
                         dict(test_runs=tests,
-                             total_time=total_time,
+                             total_time=round(total_time, 3),
                              catcher_v=catcher.APPVSN,
                              run_time_dir=run_time_dir,
                              passed=passed,
@@ -77,6 +84,7 @@ class HTMLFormatter(Formatter):
                     last_added = test
                 elif test['type'].endswith('_cleanup'):  # add cleanup to the last added test as cleanup
                     last_added['end_time'] = test['end_time']
+                    last_added['cleanup_wall_ns'] = test.get('wall_ns', 0)
                     for step in test['output']:
                         if 'comment' in step:
                             step['comment'] = 'Cleanup; ' + step['comment']
@@ -96,6 +104,7 @@ class HTMLFormatter(Formatter):
         for step in step_finish_only:
             if 'success' in step and step['nested'] == 0:
                 step['name'] = list(step['step'].keys())[0]
+                step['duration'] = _format_timing(step)
                 if step['success']:
                     passed += 1
                 else:
@@ -144,6 +153,7 @@ class HTMLFormatter(Formatter):
                     entity['success'] = step['success']
                     entity['output'] = step['output']
                     entity['time'] = step['time']
+                    entity['duration'] = _format_timing(step)
                     data += [entity]
                 continue
             elif 'data' in step:  # log
@@ -181,6 +191,27 @@ class OutputFormatter(Formatter):
         print(data)
 
 
+def expand_variables(output: list) -> list:
+    """
+    Replace variables changes in test's output entries with all variables, visible to the step.
+    Is used by formatters, which render variables for every step.
+    """
+    current = {}
+    for entry in output:
+        if 'variables' in entry:
+            current = {k: v for k, v in current.items() if k not in entry.get('removed_variables', [])}
+            current.update(entry['variables'])
+            entry['variables'] = current
+            entry.pop('removed_variables', None)
+    return output
+
+
+def _format_timing(step: dict) -> str:
+    if 'wall_ns' not in step:
+        return ''
+    return '{} (cpu {})'.format(format_ns(step['wall_ns']), format_ns(step['cpu_ns']))
+
+
 def formatter_factory(out_format: str) -> Union[Formatter, None]:
     out_format = out_format.lower()
     if out_format == 'json':
@@ -1,22 +1,46 @@
 import json
-from copy import deepcopy
+import time
+from collections import deque
 from datetime import datetime
 from os.path import join
 
+from catcher.core.scope import Scope, changes, removed
 from catcher.modules.formatter import formatter_factory
 from catcher.utils import file_utils
+from catcher.utils.time_utils import start_timer, elapsed_ns
 
 
 class LogStorage:
-    def __init__(self, output_format) -> None:
+    def __init__(self, output_format, variables_delta: bool = False) -> None:
+        """
+        :param variables_delta: store only variables changed since the previous step entry instead of all variables.
+        Such tests are marked with `variables_delta` field.
+        """
         self._data = []
         self._current_test = None
+        self._current_timer = None
+        self._last_variables = {}  # variables of the previous step entry in the current test
         self._format = output_format
+        self._variables_delta = variables_delta
         self.nesting_counter = 0
 
+    @property
+    def data(self) -> list:
+        return self._data
+
+    def merge(self, data: list):
+        """
+        Add data collected by another log storage (f.e. in a parallel runner's worker process)
+        """
+        self._data += data
+
     def test_start(self, test: str, test_type='test'):
         self._current_test = {'start_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'file': test,
                               'type': test_type, 'output': [], 'status': 'running'}
+        if self._variables_delta:
+            self._current_test['variables_delta'] = True
+        self._current_timer = start_timer()
+        self._last_variables = {}  # each test's output starts with all variables, so it can be read on it's own
 
     def test_end(self, test, success: bool, output: str = None, test_type='test', end_comment=None):
         if self._current_test:
@@ -29,18 +53,21 @@ class LogStorage:
                     self._current_test['status'] = 'FAIL'
         else:
             self._current_test = {}  # to avoid NPE on the next line
+        if self._current_timer is not None:
+            self._current_test.update(elapsed_ns(self._current_timer))
+        self._current_timer = None
         self._current_test['comment'] = end_comment
-        self._data += [{**{'end_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, **self._current_test}]
+        self._add_record({**{'end_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, **self._current_test})
         self._current_test = None
 
     def test_parse_fail(self, test: str, output: str):
-        self._data += [{'end_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'start_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'file': test,
-                        'comment': None,
-                        'type': 'test',
-                        'output': output,
-                        'status': 'FAIL'}]
+        self._add_record({'end_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                          'start_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                          'file': test,
+                          'comment': None,
+                          'type': 'test',
+                          'output': output,
+                          'status': 'FAIL'})
 
     def nested_test_in(self):
         """
@@ -55,32 +82,46 @@ class LogStorage:
         self.nesting_counter -= 1
 
     def new_step(self, step, variables):
-        self._current_test['output'] += [{'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                          'step': self.clean_step_def(step),
-                                          'variables': self.clean_vars(variables),
-                                          'nested': self.nesting_counter}]
-
-    def step_end(self, step, variables, output: str = None, success: bool = True):
-        self._current_test['output'] += [{'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                          'step': self.clean_step_def(step),
-                                          'variables': self.clean_vars(variables),
-                                          'nested': self.nesting_counter,
-                                          'success': success,
-                                          'output': output}]
+        self._add_output({'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                          'step': self.clean_step_def(step),
+                          'nested': self.nesting_counter,
+                          **self.step_variables(variables)})
+
+    def step_end(self, step, variables, output: str = None, success: bool = True, timing: dict = None):
+        """
+        :param timing: step's duration: wall clock and CPU time in nanoseconds (wall_ns, cpu_ns)
+        """
+        self._add_output({'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                          'step': self.clean_step_def(step),
+                          'nested': self.nesting_counter,
+                          'success': success,
+                          'output': output,
+                          **self.step_variables(variables),
+                          **(timing or {})})
 
     def output(self, level, output):
         if self._current_test:
-            self._current_test['output'] += [{'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                              'data': output,
-                                              'level': level}]
+            self._add_output({'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'data': output, 'level': level})
         else:
-            self._data += [{'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'data': output, 'level': level}]
+            self._add_record({'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'data': output, 'level': level})
+
+    def _add_output(self, entry: dict):
+        """
+        Add step's or log event to the current test's output
+        """
+        self._current_test['output'] += [entry]
+
+    def _add_record(self, record: dict):
+        """
+        Add finished test or log event outside of a test
+        """
+        self._data += [record]
 
     def write_report(self, path, reports_path, steps, modules, bifs):
         reports_dir = join(path, reports_path)
         file_utils.ensure_dir(reports_dir)
         formatter = formatter_factory(self._format)
-        formatter.format(path, reports_path, self._data, steps, modules, bifs)
+        formatter.format(path, reports_path, self.materialize(self._data), steps, modules, bifs)
 
     def print_summary(self, path):
         from catcher.utils import logger
@@ -88,16 +129,25 @@ class LogStorage:
         out_string = self.calculate_statistics(tests)
         for test in tests:
             out_string += '\nTest {}: '.format(file_utils.cut_path(path, test['file']))
-            # select only step's ends, which belongs to the current test (excluding registered includes run)
-            step_finish_only = [o for o in test['output'] if 'success' in o and o['nested'] == 0]
             if test['status'] == 'OK' and test['comment'] != 'Skipped':
                 out_string += logger.green('pass')
             elif test['comment'] == 'Skipped':
                 out_string += logger.yellow('skipped')
             else:
-                out_string += logger.red('fail') + ', on step {}'.format(len(step_finish_only))
+                out_string += logger.red('fail') + ', on step {}'.format(self.finished_steps(test))
+                for step in test.get('last_steps', []):
+                    out_string += '\n    {}: {}'.format(step['step'], 'OK' if step['success'] else 'Fail')
+                    if step['output'] is not None:
+                        out_string += ' ' + str(step['output'])
         logger.info(out_string)
 
+    @staticmethod
+    def finished_steps(test: dict) -> int:
+        if 'finished_steps' in test:
+            return test['finished_steps']
+        # select only step's ends, which belongs to the current test (excluding registered includes run)
+        return len([o for o in test['output'] if 'success' in o and o['nested'] == 0])
+
     @staticmethod
     def calculate_statistics(tests):
         from catcher.utils import logger
@@ -146,10 +196,42 @@ class LogStorage:
                 del step_def[k]
         return step_def
 
+    def step_variables(self, variables: dict) -> dict:
+        """
+        All variables visible to the step or only their changes (see :meth:`variables_delta`) if configured.
+        Values are not copied, but shared with the variables.
+        """
+        if self._variables_delta:
+            return self.variables_delta(variables)
+        return {'variables': dict(variables)}
+
+    def variables_delta(self, variables: dict) -> dict:
+        """
+        Variables changed (added or set to another object) since the previous step entry of this test and removed
+        ones. Values are not copied, but shared with the variables. See :func:`catcher.modules.formatter.expand_variables`
+        to get all variables.
+        Costs O(changes) for a scope, as each of its snapshots is a child of the previous one.
+        """
+        current = variables.snapshot() if isinstance(variables, Scope) else dict(variables)
+        delta = {'variables': changes(current, self._last_variables)}
+        removed_variables = removed(current, self._last_variables)
+        if removed_variables:
+            delta['removed_variables'] = removed_variables
+        self._last_variables = current
+        return delta
+
     @staticmethod
-    def clean_vars(variables: dict):
-        """ Clean _get_action(s) non-json serializable functions """
-        return deepcopy({k: v for k, v in variables.items() if not callable(v)})
+    def materialize(data: list) -> list:
+        """
+        Clean _get_action(s) non-json serializable functions from variables
+        """
+        for test in data:
+            if not isinstance(test.get('output'), list):
+                continue
+            for step in test['output']:
+                if 'variables' in step:
+                    step['variables'] = {k: v for k, v in step['variables'].items() if not callable(v)}
+        return data
 
     @staticmethod
     def is_jsonable(x):
@@ -162,17 +244,155 @@ class LogStorage:
 
 class EmptyLogStorage(LogStorage):
     """
-    The default implementation. Does nothing.
+    The default implementation. Keeps only tests' results and the number of finished steps, needed for the summary,
+    so memory doesn't grow with the number of steps. Optionally keeps `last_steps` last finished steps of every test
+    (their names, results and outputs) to show them for failed tests in the summary.
     """
 
-    def new_step(self, step, variables):  # ignore variables to free memory
-        super().new_step(step, {})
+    def __init__(self, output_format, last_steps: int = 0) -> None:
+        super().__init__(output_format)
+        self.last_steps = last_steps
 
-    def step_end(self, step, variables, output: str = None, success: bool = True):  # ignore variables to free memory
-        super().step_end(step, {}, output, success)
+    def test_start(self, test: str, test_type='test'):
+        self._current_test = {'start_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'file': test,
+                              'type': test_type, 'status': 'running', 'finished_steps': 0}
+        if self.last_steps > 0:
+            self._current_test['last_steps'] = deque(maxlen=self.last_steps)
+        self._current_timer = start_timer()
+
+    def new_step(self, step, variables):
+        pass
+
+    def step_end(self, step, variables, output: str = None, success: bool = True, timing: dict = None):
+        if not self._current_test or self.nesting_counter > 0:  # steps of registered includes are not counted
+            return
+        self._current_test['finished_steps'] += 1
+        if 'last_steps' in self._current_test:
+            [step_name] = step.keys()
+            if isinstance(step[step_name], dict) and 'name' in step[step_name]:
+                step_name = str(step[step_name]['name'])
+            self._current_test['last_steps'].append({'step': step_name, 'success': success, 'output': output})
 
     def output(self, level, output):
         pass
 
+    def _add_record(self, record: dict):
+        if 'last_steps' in record:
+            record['last_steps'] = list(record['last_steps'])
+        super()._add_record(record)
+
     def write_report(self, path, reports_path, *args):
         pass
+
+
+class SilentLogStorage(EmptyLogStorage):
+    """
+    Stores nothing. Is used when the same steps are run many times concurrently (f.e. bench), where neither step's
+    output nor the report are needed.
+    """
+
+    def test_start(self, test: str, test_type='test'):
+        pass
+
+    def test_end(self, test, success: bool, output: str = None, test_type='test', end_comment=None):
+        pass
+
+    def new_step(self, step, variables):
+        pass
+
+    def step_end(self, step, variables, output: str = None, success: bool = True, timing: dict = None):
+        pass
+
+
+class StreamingLogStorage(LogStorage):
+    """
+    Writes every event (test start and end, step start and end, log output) to the json-lines report file as soon as
+    it happens, instead of keeping all of them in memory till the end of the run. The file is flushed every
+    `flush_interval` seconds and after each test. Only tests' results are kept in memory for the summary.
+    Use :func:`read_report` (or `catcher report <file>`) to build other reports from the file.
+    """
+
+    def __init__(self, output_format, reports_dir: str, flush_interval: float = 1,
+                 variables_delta: bool = False) -> None:
+        super().__init__(output_format, variables_delta=variables_delta)
+        file_utils.ensure_dir(reports_dir)
+        self.file = join(reports_dir, 'report_' + str(time.time()) + '.jsonl')
+        self.flush_interval = flush_interval
+        self._stream = open(self.file, 'w', encoding='utf-8')
+        self._last_flush = time.monotonic()
+        self._finished_steps = 0
+
+    def merge(self, data: list):
+        for record in data:
+            if isinstance(record.get('output'), list):  # finished test with all it's output
+                self._finished_steps = 0
+                self._write('test_start', {k: v for k, v in record.items() if k != 'output'})
+                for entry in record['output']:
+                    self._add_output(entry)
+            self._add_record(record)
+
+    def test_start(self, test: str, test_type='test'):
+        super().test_start(test, test_type)
+        self._finished_steps = 0
+        self._write('test_start', {k: v for k, v in self._current_test.items() if k != 'output'})
+
+    def _add_output(self, entry: dict):
+        if 'success' in entry and entry['nested'] == 0:
+            self._finished_steps += 1
+        self._write(_event_type(entry), entry)
+
+    def _add_record(self, record: dict):
+        if 'file' not in record:  # log outside of a test
+            self._write('log', record)
+            return
+        if isinstance(record.get('output'), list):
+            summary = {**{k: v for k, v in record.items() if k != 'output'}, 'finished_steps': self._finished_steps}
+            self._write('test_end', {k: v for k, v in record.items() if k != 'output'})
+        else:  # parse error
+            summary = record
+            self._write('test_parse_fail', record)
+        self._data += [summary]
+        self._stream.flush()
+
+    def _write(self, event: str, entry: dict):
+        if self._stream.closed:  # report is finished (f.e. run summary is printed)
+            return
+        if 'variables' in entry:
+            entry = {**entry, 'variables': {k: v for k, v in entry['variables'].items() if not callable(v)}}
+        self._stream.write(json.dumps({'event': event, **entry}, default=str) + '\n')
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self._stream.flush()
+            self._last_flush = time.monotonic()
+
+    def write_report(self, path, reports_path, *args):
+        if not self._stream.closed:
+            self._stream.close()
+            from catcher.utils import logger
+            logger.info('Report is written to ' + self.file)
+
+
+def _event_type(entry: dict) -> str:
+    if 'step' not in entry:
+        return 'log'
+    return 'step_end' if 'success' in entry else 'step_start'
+
+
+def read_report(file: str) -> list:
+    """
+    Read json-lines report, written by :class:`StreamingLogStorage`, into the same data :class:`LogStorage` collects
+    in memory, so that it can be passed to any formatter.
+    """
+    data = []
+    current = None
+    for record in file_utils.iter_json_lines(file):
+        event = record.pop('event')
+        if event == 'test_start':
+            current = {**record, 'output': []}
+        elif event == 'test_end':
+            data += [{**record, 'output': current['output'] if current else []}]
+            current = None
+        elif event in ('step_start', 'step_end') or (event == 'log' and current is not None):
+            current['output'] += [record]
+        else:  # parse failure or log outside of a test
+            data += [record]
+    return data
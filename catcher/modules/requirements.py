@@ -4,6 +4,7 @@ from os.path import isfile, join
 
 from catcher.modules import Module
 from catcher.utils.logger import debug
+from catcher.utils.misc import clear_import_cache
 
 
 class Requirements(Module):
@@ -21,8 +22,9 @@ class Requirements(Module):
     def before(self, *args, **kwargs):
         requirements = self.find_resource_file()
         if requirements:
-            debug('Installing requirements: {}'.format(requirements))
+            debug('Installing requirements: {}', requirements)
             subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', requirements])
+            clear_import_cache()  # new packages can be imported now
 
     def after(self, *args, **kwargs):
         # does nothing
@@ -2,7 +2,7 @@ from abc import abstractmethod
 
 from catcher.steps.step import Step, update_variables, SERVICE_KEYS
 from catcher.utils.logger import debug
-from catcher.utils.misc import fill_template, fill_template_str
+from catcher.utils.misc import fill_template, fill_template_str, fill_template_native
 from catcher.utils.module_utils import get_all_subclasses_of
 
 
@@ -70,7 +70,7 @@ class Equals(Operator):
         if self.negative:
             result = not result
         if not result:
-            debug(str(source) + ' is not equal to ' + str(subject))
+            debug('{} is not equal to {}', source, subject)
         return result
 
     def determine_source(self, body: dict):
@@ -120,7 +120,7 @@ class Contains(Operator):
         if self.negative:
             result = not result
         if not result:
-            debug(str(subject) + ' is not in ' + str(source))
+            debug('{} is not in {}', subject, source)
         return result
 
     def determine_source(self, body: dict):
@@ -215,13 +215,13 @@ class All(Operator):
 
     def operation(self, variables) -> bool:
         body = self.subject[self.body]
-        source = fill_template(body['of'], variables)
+        source = fill_template_native(body['of'], variables)
         if isinstance(source, list):
             elements = source
         elif isinstance(source, dict):
             elements = source.items()
         else:
-            debug(str(source) + ' not iterable')
+            debug('{} not iterable', source)
             return False
         results = []
         for element in elements:
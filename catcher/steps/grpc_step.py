@@ -3,7 +3,7 @@ from os.path import dirname, join
 from catcher.steps.step import Step, update_variables
 from catcher.utils import module_utils
 from catcher.utils import file_utils
-from catcher.utils.misc import fill_template, fill_template_str, try_get_objects
+from catcher.utils.misc import fill_template, fill_template_object
 
 
 class GRPC(Step):
@@ -128,5 +128,5 @@ class GRPC(Step):
         # find method's input type
         input_type = method.input_type
         classes = module_utils.get_all_classes(mod)
-        data = try_get_objects(fill_template_str(self.data, variables))
+        data = fill_template_object(self.data, variables)
         return method.name, classes[input_type.name](**data)
@@ -1,3 +1,4 @@
+import contextvars
 import json
 import os
 import re
@@ -10,6 +11,8 @@ from catcher.utils.logger import debug, warning
 from catcher.utils.misc import fill_template, fill_template_str
 from catcher.utils import file_utils
 
+_sessions = contextvars.ContextVar('http_sessions', default=None)  # sessions of the current virtual user (bench)
+
 
 class Http(Step):
     """
@@ -167,6 +170,19 @@ class Http(Step):
     """
     sessions = {}
 
+    @staticmethod
+    def own_sessions():
+        """
+        Keep sessions of the current coroutine (and tasks it creates) apart from others' ones. Is used by bench for
+        virtual users not to share cookies.
+        """
+        _sessions.set({})
+
+    @staticmethod
+    def current_sessions() -> dict:
+        sessions = _sessions.get()
+        return Http.sessions if sessions is None else sessions
+
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
         method = Step.filter_predefined_keys(kwargs)  # get/post/put...
@@ -190,22 +206,22 @@ class Http(Step):
     @update_variables
     def action(self, includes: dict, variables: dict) -> Union[tuple, dict]:
         url = fill_template(self.url, variables)
-        session = Http.sessions.get(self.session, requests.Session())
+        session = Http.current_sessions().get(self.session, requests.Session())
         r = None
         try:
             r = session.request(self.method, url, **self._form_request(url, variables))
             if self._should_fail:  # fail expected
                 raise RuntimeError('Request expected to fail, but it doesn\'t')
         except requests.exceptions.ConnectionError as e:
-            debug(str(e))
+            debug(lambda: str(e))
             if self._should_fail:  # fail expected
                 return variables
         self.__fix_cookies(url, session)
         if self.session is not None:  # save session if name is specified
-            Http.sessions[self.session] = session
+            Http.current_sessions()[self.session] = session
         if r is None:
             raise Exception('No response received')
-        debug(r.text)
+        debug(lambda: r.text)
         try:
             response = r.json()
         except ValueError:
@@ -219,7 +235,7 @@ class Http(Step):
                         for k, v in self.headers.items()])
         rq = dict(verify=self.verify, headers=headers, files=self.__form_files(variables))
         isjson, body = self.__form_body(variables)
-        debug('http ' + str(self.method) + ' ' + str(url) + ', ' + str(headers) + ', ' + str(body))
+        debug('http {} {}, {}, {}', self.method, url, headers, body)
         content_type = self.__get_content_type(headers)
         if isinstance(body, str):  # decode all strings to utf to prevents latin-1 errors
             body = body.encode('utf-8')
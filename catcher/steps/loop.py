@@ -1,11 +1,20 @@
+import functools
 import itertools
-import json
 from collections.abc import Iterable
-from catcher.utils import logger
+from os.path import join
+
+from catcher.core.scope import Scope, changes
+from catcher.utils import logger, file_utils
+from catcher.utils.async_utils import gather_limited
 from catcher.steps.check import Operator
 from catcher.steps.step import Step, update_variables, SkipException
 from catcher.utils.logger import debug
-from catcher.utils.misc import fill_template_str, try_get_objects
+from catcher.utils.misc import fill_template, fill_template_str, fill_template_object
+
+FOREACH_SOURCES = {'in_variable': None,
+                   'in_lines': file_utils.iter_lines,
+                   'in_csv': file_utils.iter_csv,
+                   'in_jsonl': file_utils.iter_json_lines}  # lazy sources, which are iterated without copying
 
 
 class Loop(Step):
@@ -27,7 +36,17 @@ class Loop(Step):
 
     - in: variable or static list. **ITEM** variable can be used to access each element of the data structure.
             Data structure can be list, dict or any other python data structure which supports iteration.
+    - in_variable: name of the variable to iterate. Use it instead of `in` for big data structures: the variable
+            is iterated as is, without rendering it via template.
+    - in_lines: resource file to iterate line by line.
+    - in_csv: resource csv file (with headers) to iterate. Each row is a dict of header -> value.
+            Set `delimiter` if it is not a comma.
+    - in_jsonl: resource json-lines file to iterate. Each line is a separate json object.
     - do: the action to be performed. Can be a list of actions or single one.
+    - parallel: number of iterations to run at the same time. *Optional* default is one by one. Each parallel
+            iteration has it's own copy of variables and doesn't see variables registered by others. Every variable
+            registered in iterations becomes a list of values in order of **in** elements (null for iterations,
+            which didn't register it). The first failed iteration stops the loop.
 
     :Examples:
 
@@ -108,6 +127,42 @@ class Loop(Step):
                             equals: {the: '{{ documents.count }}', is: 2}
 
 
+    Check provisioning for all tenants, 20 at a time, and collect their statuses to the list
+    ::
+
+        loop:
+            foreach:
+                in: '{{ tenant_ids }}'
+                parallel: 20
+                do:
+                    http:
+                        get:
+                            url: '{{ provisioning_url }}/tenants/{{ ITEM }}'
+                        register: {status: '{{ OUTPUT.status }}'}
+        # status is ['ready', 'ready', ...] in order of tenant_ids
+
+    Send every event from big json-lines file in resources, reading it line by line
+    ::
+
+        loop:
+            foreach:
+                in_jsonl: 'events/all_events.jsonl'
+                do:
+                    http:
+                        post:
+                            url: '{{ events_url }}'
+                            body: '{{ ITEM |tojson }}'
+
+    Check every user from csv file in resources
+    ::
+
+        loop:
+            foreach:
+                in_csv: 'users.csv'
+                delimiter: ';'
+                do:
+                    check: {equals: {the: '{{ ITEM.email }}', is_not: ''}}
+
     Note that db_1 template has additional quotes ``"{{ db_1 }}"``. Your **in** should contain valid object. As db_1 is
     just a string - it should be put in quotes. Otherwise **in** value will be corrupted.
     Always make sure your in value is valid. It may also have some difficulties with json as string.
@@ -132,44 +187,88 @@ class Loop(Step):
             else:
                 self.if_clause = if_clause
         elif self.type == 'foreach':
-            self.in_var = kwargs['foreach']['in']
+            foreach = kwargs['foreach']
+            sources = [key for key in ['in'] + list(FOREACH_SOURCES) if key in foreach]
+            if len(sources) != 1:
+                raise ValueError('Foreach requires exactly one of in, {}. Got: {}'.format(', '.join(FOREACH_SOURCES),
+                                                                                          sources))
+            [self.source] = sources
+            self.in_var = foreach[self.source]
+            self.delimiter = foreach.get('delimiter', ',')
+            self.parallel = foreach.get('parallel')
         else:
             raise ValueError('Wrong configuration for step: ' + str(kwargs))
 
     @update_variables
-    def action(self, includes: dict, variables: dict) -> dict:
+    async def action(self, includes: dict, variables: dict) -> dict:
         output = variables
         if self.type == 'while':
             operator = Operator.find_operator(self.if_clause)
+            cycles_left = self.max_cycle  # step object is reused between runs and should not be modified
             while operator.operation(output):
-                output = self.__run_actions(includes, output)
-                if self.max_cycle is not None:
-                    if self.max_cycle == 0:
+                output = await self.__run_actions(includes, output)
+                if cycles_left is not None:
+                    if cycles_left == 0:
                         break
-                    self.max_cycle = self.max_cycle - 1
+                    cycles_left = cycles_left - 1
             return output
         elif self.type == 'foreach':
-            loop_var = try_get_objects(fill_template_str(json.dumps(self.in_var), variables))
+            loop_var = self.__get_loop_var(variables)
             if not isinstance(loop_var, Iterable):
                 raise ValueError(str(loop_var) + ' is not iterable')
+            parallel = fill_template(self.parallel, variables) if self.parallel is not None else None
+            if parallel:
+                return await self.__foreach_parallel(includes, output, loop_var, int(parallel))
             for entry in loop_var:
-                debug('Looping over {}'.format(entry))
+                debug('Looping over {}', entry)
                 output['ITEM'] = entry
-                output = self.__run_actions(includes, output)
+                output = await self.__run_actions(includes, output)
         return output
 
-    def __run_actions(self, includes, variables: dict) -> dict:
+    def __get_loop_var(self, variables: dict) -> Iterable:
+        if self.source == 'in':
+            return fill_template_object(self.in_var, variables)
+        if self.source == 'in_variable':
+            name = fill_template_str(self.in_var, variables)
+            if name not in variables:
+                raise ValueError('No variable ' + name + ' to iterate')
+            return variables[name]
+        file = join(variables['RESOURCES_DIR'], fill_template_str(self.in_var, variables))
+        if self.source == 'in_csv':
+            return file_utils.iter_csv(file, fill_template_str(self.delimiter, variables))
+        return FOREACH_SOURCES[self.source](file)
+
+    async def __foreach_parallel(self, includes, variables: dict, loop_var: Iterable, parallel: int) -> dict:
+        async def iteration(entry):
+            debug('Looping over {}', entry)
+            scope = Scope(variables)
+            scope['ITEM'] = entry
+            return changes(await self.__run_actions(includes, scope), variables)
+
+        results = await gather_limited((functools.partial(iteration, entry) for entry in loop_var), parallel)
+        registered = {}  # variable -> list of values, in order of the first registration
+        for i, result in enumerate(results):
+            for key, value in result.items():
+                if key == 'ITEM':
+                    continue
+                if key not in registered:
+                    registered[key] = [None] * len(results)
+                registered[key][i] = value
+        variables.update(registered)
+        return variables
+
+    async def __run_actions(self, includes, variables: dict) -> dict:
         output = variables
         for action in self.do_action:
             try:
                 action.check_skip(variables)
-                output = action.action(includes, output)
+                output = await action.run_action_async(includes, output)
             except SkipException:  # skip this step
-                debug('SubStep ' + fill_template_str(action.name, variables) + logger.yellow(' skipped'))
+                debug(lambda: 'SubStep ' + fill_template_str(action.name, variables) + logger.yellow(' skipped'))
                 return output
             except Exception as e:
                 if action.ignore_errors:
-                    debug('{} got {} but we ignore it'.format(fill_template_str(action.name, variables), e))
+                    debug(lambda: '{} got {} but we ignore it'.format(fill_template_str(action.name, variables), e))
                     break
                 raise e
         return output
@@ -0,0 +1,94 @@
+import functools
+
+from catcher.core.scope import Scope, changes
+from catcher.steps.step import Step, update_variables, SkipException
+from catcher.utils import logger
+from catcher.utils.async_utils import gather_limited
+from catcher.utils.logger import debug
+from catcher.utils.misc import fill_template, fill_template_str
+
+
+class Parallel(Step):
+    """
+    Run several independent actions concurrently. Is useful when you need to seed data into several services or
+    call several slow endpoints and don't want to wait for each of them one by one.
+
+    :Input:
+
+    :do: list of actions to run. Each action can have several sub actions (via `actions`), which are run one by one.
+    :limit: max number of actions run at the same time. *Optional*. Default is all of them.
+
+    Each action is run with its own copy of variables. After all actions finish, variables they registered are
+    added to the test's variables in the order actions are listed (if two actions register the same variable - the
+    later one wins). If any action fails - all others are cancelled and the step fails.
+    Actions which are not started yet are never run, while already running sync actions are finished in background,
+    but their results are ignored.
+
+    :Examples:
+
+    Seed data into two services at the same time
+    ::
+
+        parallel:
+            do:
+                - http:
+                    post:
+                        url: '{{ users_service }}/users'
+                        body: {name: 'John Doe'}
+                    register: {user_id: '{{ OUTPUT.id }}'}
+                - postgres:
+                    request:
+                        conf: '{{ pg_conf }}'
+                        query: "insert into accounts(name) values('John Doe') returning id"
+                    register: {account_id: '{{ OUTPUT.id }}'}
+
+    Run shell commands, not more than two at a time
+    ::
+
+        parallel:
+            limit: 2
+            do:
+                - sh: {command: './prepare_one.sh'}
+                - sh: {command: './prepare_two.sh'}
+                - sh: {command: './prepare_three.sh'}
+
+    """
+
+    def __init__(self, _get_action=None, _get_actions=None, do=None, limit=None, **kwargs) -> None:
+        super().__init__(**kwargs)
+        if not do:
+            raise ValueError('Parallel step requires a list of actions in do')
+        if isinstance(do, dict):
+            do = [{k: v} for k, v in do.items()]
+        self.children = [_get_actions(act) for act in do]
+        self.limit = limit
+
+    @update_variables
+    async def action(self, includes: dict, variables: dict) -> dict:
+        limit = fill_template(self.limit, variables) if self.limit is not None else None
+        jobs = [functools.partial(self._run_child, actions, includes, variables) for actions in self.children]
+        registered = {}
+        for child_registered in await gather_limited(jobs, int(limit) if limit else None):
+            registered.update(child_registered)  # in order of actions, not in order of finish
+        variables.update(registered)
+        return variables
+
+    @staticmethod
+    async def _run_child(actions: list, includes: dict, variables: dict) -> dict:
+        """
+        Run child's actions in it's own scope and return variables it registered.
+        """
+        output = Scope(variables)
+        for action in actions:
+            try:
+                action.check_skip(output)
+                output = await action.run_action_async(includes, output)
+            except SkipException:
+                debug(lambda: 'SubStep ' + fill_template_str(action.name, output) + logger.yellow(' skipped'))
+                break
+            except Exception as e:
+                if action.ignore_errors:
+                    debug(lambda: '{} got {} but we ignore it'.format(fill_template_str(action.name, output), e))
+                    break
+                raise e
+        return changes(output, variables)
@@ -100,7 +100,7 @@ class Run(Step):
                 self.include = _body
 
     @update_variables
-    def action(self, includes: dict, variables: dict) -> dict:
+    async def action(self, includes: dict, variables: dict) -> dict:
         filled_vars = dict([(k, fill_template(v, variables)) for (k, v) in self.variables.items()])
         out = fill_template_str(self.include, variables)
         test, tag = get_tag(out)
@@ -113,7 +113,7 @@ class Run(Step):
         try:
             info('Running {}.{}'.format(test, '' if tag is None else tag))
             logger.log_storage.nested_test_in()
-            variables = include.run(tag=tag, raise_stop=True)
+            variables = await include.run_async(tag=tag, raise_stop=True)
             logger.log_storage.nested_test_out()
         except SkipException:
             logger.log_storage.nested_test_out()
@@ -50,6 +50,6 @@ class Sh(Step):
                                                              variables,
                                                              fill_template(self._path, variables))
         if return_code != int(fill_template(self._return_code, variables)):
-            debug('Process return code {}.\nStderr is {}\nStdout is {}'.format(return_code, stderr, stdout))
+            debug('Process return code {}.\nStderr is {}\nStdout is {}', return_code, stderr, stdout)
             raise Exception(stderr)
         return variables, stdout
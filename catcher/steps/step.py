@@ -1,8 +1,11 @@
+import inspect
 import types
+from collections import ChainMap
 from abc import abstractmethod
 from functools import wraps
 
-from catcher.utils.misc import try_get_object, merge_two_dicts, fill_template
+from catcher.utils.async_utils import run_in_thread
+from catcher.utils.misc import try_get_object, fill_template_native
 
 registered_steps = {}
 
@@ -164,7 +167,9 @@ class Step(object, metaclass=MetaStep):
     @abstractmethod
     def action(self, includes: dict, variables: dict) -> dict or tuple:
         """
-        Perform an action.
+        Perform an action. Can be a coroutine (`async def action`) - it will be awaited by the test's event loop.
+        Sync actions are called in the loop's thread, except for concurrent runs (parallel step, loop's
+        `parallel`, wait and bench), where they are run in a thread pool.
 
         :param includes: Script includes.
         :param variables: Script variables.
@@ -194,6 +199,19 @@ class Step(object, metaclass=MetaStep):
         """
         pass
 
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.action)
+
+    async def run_action_async(self, includes: dict, variables: dict) -> dict:
+        """
+        Run the action from the async code. Sync action is run in the current thread pool (see
+        :func:`catcher.utils.async_utils.thread_pool`) if set, so that it doesn't block concurrent steps.
+        """
+        if self.is_async:
+            return await self.action(includes, variables)
+        return await run_in_thread(self.action, includes, variables)
+
     def check_skip(self, variables: dict):
         if self.skip_if is None:
             return False
@@ -211,17 +229,17 @@ class Step(object, metaclass=MetaStep):
         if self.register is not None:
             for key in self.register.keys():
                 if output is not None:
-                    out = fill_template(self.register[key],
-                                        merge_two_dicts(variables, {'OUTPUT': try_get_object(output)}))
+                    out = fill_template_native(self.register[key],
+                                               ChainMap({'OUTPUT': try_get_object(output)}, variables))
                 else:
-                    out = fill_template(self.register[key], variables)
+                    out = fill_template_native(self.register[key], variables)
                 variables[key] = out
         return variables
 
 
 def update_variables(func):
     """
-    Use this decorator on Step.action implementation.
+    Use this decorator on Step.action implementation (both sync and async).
 
     Your action method should always return variables, or
     both variables and output.
@@ -230,12 +248,21 @@ def update_variables(func):
 
     """
 
-    @wraps(func)
-    def wrapper(self, *args, **kwargs):
-        result = func(self, *args, **kwargs)
+    def register(self, result):
         if isinstance(result, tuple):
             return self.process_register(result[0], result[1])
         else:
             return self.process_register(result)
 
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            return register(self, await func(self, *args, **kwargs))
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return register(self, func(self, *args, **kwargs))
+
     return wrapper
@@ -1,11 +1,19 @@
+import asyncio
 import itertools
+import os
+import random
+import re
 import time
-from concurrent.futures import ThreadPoolExecutor
-from copy import deepcopy
-from time import sleep
+from typing import Optional
+from catcher.core.scope import Scope
 from catcher.steps.step import Step, update_variables
+from catcher.utils.async_utils import thread_pool
 from catcher.utils.time_utils import to_seconds
 from catcher.utils.logger import debug
+from catcher.utils.misc import fill_template, fill_template_str
+
+CONDITION_POLL_INTERVAL = 0.01  # how often file and log conditions look for changes, in seconds
+PARTIAL_LINE_QUIET_PERIOD = 0.2  # last line without line ending is checked if file wasn't changed for it, in seconds
 
 
 class Wait(Step):
@@ -23,6 +31,27 @@ class Wait(Step):
     :milliseconds: several milliseconds
     :nanoseconds: several nanoseconds
     :for: (list of actions) will repeat them till they all finishes successfully. Will fail if time ends.
+    :interval: seconds to sleep between attempts of `for`. *Optional* default is 0.1
+    :backoff: multiply interval by it after each failed attempt. *Optional* default is 1 (constant interval)
+    :max_interval: the limit for the interval growing with backoff. *Optional* default is no limit.
+    :jitter: randomly shorten each sleep by up to this fraction of the interval (0-1), so that several waiting tests
+             don't hit the service at the same moment. *Optional* default is 0
+
+    :port: wait till tcp port accepts connections. Either `host:port` string, port number (for localhost) or dict
+           with `host` and `port`.
+    :file: wait till file exists. Either path or dict with `path` and optional `contains`: a text to appear in a file's
+           line.
+    :log: wait till a line matching regexp appears in a file. Dict with `file` and `regex`. Output has matched `line`
+          and regex `groups`. Log file can be rotated (truncated or recreated) while waiting. Only complete lines are
+          checked, the last one without line ending - when the file is not changed for 0.2 seconds.
+
+    One of `for`, `port`, `file` or `log` can be used in a single wait. `port`, `file` and `log` are checked
+    without running any steps or processes, so they react on change in milliseconds and use almost no CPU. Paths
+    are relative to the current directory.
+
+    When time ends the running attempt is cancelled (sync steps, which can't be interrupted, are left to finish in
+    background and their results are ignored). Output of the step with `for` is a dict with number of `attempts` and
+    `elapsed` seconds.
 
     :Examples:
 
@@ -45,11 +74,34 @@ class Wait(Step):
                             httpResponse: {'body': 'hello world'}
                         response_code: 201
 
-    Wait for postgres to be populated
+    Wait for postgres port to be opened
     ::
 
         wait:
             seconds: 30
+            port: 'localhost:5432'
+
+    Wait for the service to start
+    ::
+
+        wait:
+            minutes: 1
+            log:
+                file: 'logs/service.log'
+                regex: 'Started on port (\\d+)'
+            register: {service_port: '{{ OUTPUT.groups[0] }}'}
+
+    Wait for postgres to be populated, polling it every second, then every 2, 4, ... but not less often than every 10
+    seconds. Register number of attempts it took.
+    ::
+
+        wait:
+            seconds: 30
+            interval: 1
+            backoff: 2
+            max_interval: 10
+            jitter: 0.1
+            register: {attempts: '{{ OUTPUT.attempts }}'}
             for:
                 - postgres:
                       request:
@@ -59,9 +111,18 @@ class Wait(Step):
                 - check: {equals: {the: '{{ documents }}', is_not: 0}}
     """
 
-    def __init__(self, _get_action=None, _get_actions=None, **kwargs) -> None:
+    def __init__(self, _get_action=None, _get_actions=None, interval=0.1, backoff=1, max_interval=None, jitter=0,
+                 port=None, file=None, log=None, **kwargs) -> None:
         super().__init__(**kwargs)
         self.delay = to_seconds(kwargs)
+        self.conditions = {k: v for k, v in [('port', port), ('file', file), ('log', log)] if v is not None}
+        if len(self.conditions) + ('for' in kwargs) > 1:
+            raise ValueError('Only one of for, port, file or log can be used in wait. Got: '
+                             + ', '.join(list(self.conditions) + ['for']))
+        self.interval = interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.jitter = jitter
         self._actions = None
         if 'for' in kwargs:
             wait_for = kwargs['for']
@@ -74,32 +135,162 @@ class Wait(Step):
                 self._actions = list(itertools.chain.from_iterable([_get_actions(act) for act in wait_for]))
 
     @update_variables
-    def action(self, includes: dict, variables: dict) -> dict:
-        if self._actions is not None:
-            # run thread and either exit on success or wait fixed time
-            pool = ThreadPoolExecutor(max_workers=1)
-            future = pool.submit(self.run_loop, includes, variables)
-            try:
-                return future.result()
-            except TimeoutError:
-                return variables
+    async def action(self, includes: dict, variables: dict) -> dict:
+        if self._actions is not None:  # either exit on success or fail on time limit
+            return await self.run_loop(includes, variables)
+        elif self.conditions:
+            return await self.wait_condition(variables)
         else:  # wait fixed time
-            sleep(self.delay)
+            await asyncio.sleep(self.delay)
             return variables
 
-    def run_loop(self, includes, variables):
-        output = variables
-        repeat = True
-        start = time.time()
-        while repeat:
-            if time.time() > start + self.delay:  # time limit reached
-                raise Exception('Time limit reach with no success from substeps')
-            loop_vars = deepcopy(output)  # start every loop from the same variables
+    async def run_loop(self, includes, variables):
+        # sync substeps run in a thread of their own, so that the time limit is not blocked by them
+        with thread_pool(1):
+            return await self.__run_loop(includes, variables)
+
+    async def __run_loop(self, includes, variables):
+        interval = float(fill_template(self.interval, variables))
+        backoff = float(fill_template(self.backoff, variables))
+        max_interval = fill_template(self.max_interval, variables)
+        jitter = float(fill_template(self.jitter, variables))
+        start = time.monotonic()
+        deadline = start + self.delay
+        attempts = 0
+        error = None
+        while True:
+            attempts += 1
             try:
-                for action in self._actions:
-                    loop_vars = action.action(includes, loop_vars)
-                repeat = False
-                output = loop_vars  # if loop was successful - return modified variables
+                output = await asyncio.wait_for(self.__run_attempt(includes, variables),
+                                                max(deadline - time.monotonic(), 0))
+                # if attempt was successful - return modified variables
+                return output, {'attempts': attempts, 'elapsed': time.monotonic() - start}
+            except asyncio.TimeoutError as e:  # attempt was cancelled on time limit - keep the previous error
+                error = error if time.monotonic() >= deadline and error is not None else e
+                debug('Wait step failure {}', type(e).__name__)
             except Exception as e:
-                debug('Wait step failure {}'.format(e))
-        return output
+                error = e
+                debug('Wait step failure {}', e)
+            sleep = min(interval * (1 - jitter * random.random()), deadline - time.monotonic())
+            if sleep <= 0:  # time limit reached
+                raise Exception('Time limit reach with no success from substeps after {} attempts. '
+                                'Last error: {}'.format(attempts, str(error) or type(error).__name__))
+            await asyncio.sleep(sleep)
+            interval *= backoff
+            if max_interval is not None:
+                interval = min(interval, float(max_interval))
+
+    async def __run_attempt(self, includes, variables):
+        loop_vars = Scope(variables)  # start every loop from the same variables
+        for action in self._actions:
+            loop_vars = await action.run_action_async(includes, loop_vars)
+        return loop_vars
+
+    async def wait_condition(self, variables):
+        [(condition, body)] = self.conditions.items()
+        if isinstance(body, dict):
+            body = {k: fill_template_str(v, variables) for k, v in body.items()}
+        else:
+            body = fill_template_str(body, variables)
+        if condition == 'port':
+            wait = _wait_port(*_parse_address(body))
+        elif condition == 'file' and not isinstance(body, dict):
+            wait = _wait_file(str(body))
+        elif condition == 'file' and 'contains' not in body:
+            wait = _wait_file(body['path'])
+        elif condition == 'file':
+            wait = _wait_line(body['path'], lambda line: body['contains'] in line)
+        else:
+            wait = _wait_line(body['file'], re.compile(body['regex']).search)
+        start = time.monotonic()
+        try:
+            output = await asyncio.wait_for(wait, self.delay)
+        except asyncio.TimeoutError:
+            raise Exception('Time limit reach waiting for {} {}'.format(condition, body))
+        output['elapsed'] = time.monotonic() - start
+        return variables, output
+
+
+def _parse_address(address) -> tuple:
+    if isinstance(address, dict):
+        return address.get('host', 'localhost'), int(address['port'])
+    if ':' not in address:
+        return 'localhost', int(address)
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+async def _wait_port(host: str, port: int) -> dict:
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)  # non blocking connect
+            writer.close()
+            return {}
+        except OSError as e:
+            debug('Port {}:{} is not available: {}', host, port, e)
+            await asyncio.sleep(CONDITION_POLL_INTERVAL)
+
+
+async def _wait_file(path: str) -> dict:
+    while not os.path.exists(path):
+        await asyncio.sleep(CONDITION_POLL_INTERVAL)
+    return {}
+
+
+async def _wait_line(path: str, matches) -> dict:
+    """
+    Tail the file from the start till the line matches. Only new data is read on each check.
+    Only complete lines are checked, so that the line being written is not matched partially. Last line without
+    line ending is checked, when nothing was written to the file for PARTIAL_LINE_QUIET_PERIOD seconds.
+    """
+    stream = None
+    inode = None
+    offset = 0  # bytes read, text stream's tell() can't be compared with file size
+    buffer = b''
+    last_data = time.monotonic()
+    partial_checked = False
+    try:
+        while True:
+            if stream is None and os.path.exists(path):
+                stream = open(path, mode='rb')
+                inode = os.fstat(stream.fileno()).st_ino
+                offset = 0
+                buffer = b''
+            if stream is not None:
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    stat = None
+                if stat is None or stat.st_ino != inode or stat.st_size < offset:  # rotated
+                    stream.close()
+                    stream = None
+                    continue
+                data = stream.read()
+                if data:
+                    offset += len(data)
+                    last_data = time.monotonic()
+                    partial_checked = False
+                    *lines, buffer = (buffer + data).split(b'\n')
+                    for line in lines:
+                        output = _match_line(line, matches)
+                        if output is not None:
+                            return output
+                elif buffer and not partial_checked \
+                        and time.monotonic() - last_data >= PARTIAL_LINE_QUIET_PERIOD:  # last line without line end
+                    partial_checked = True
+                    output = _match_line(buffer, matches)
+                    if output is not None:
+                        return output
+            await asyncio.sleep(CONDITION_POLL_INTERVAL)
+    finally:
+        if stream is not None:
+            stream.close()
+
+
+def _match_line(line: bytes, matches) -> Optional[dict]:
+    line = line.decode('utf-8', errors='replace').rstrip('\r')
+    match = matches(line)
+    if not match:
+        return None
+    groups = list(match.groups()) if hasattr(match, 'groups') else []
+    return {'line': line, 'groups': groups}
@@ -0,0 +1,96 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, Iterable
+
+_executor = contextvars.ContextVar('executor', default=None)  # thread pool of the current concurrent block
+
+
+def run_sync(coroutine):
+    """
+    Run the coroutine from the sync code and return it's result.
+    It is run in a new event loop, or in a separate thread if this thread already runs an event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+        running = True
+    except RuntimeError:  # no event loop in this thread
+        running = False
+    if not running:  # run outside of except block, so that coroutine's errors are not chained to this one
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coroutine).result()
+
+
+@contextmanager
+def thread_pool(workers: int):
+    """
+    Run sync functions, started via :func:`run_in_thread` by coroutines of this block (and tasks they create), in a
+    dedicated pool of `workers` threads, so that `workers` of them can run at the same time.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(workers, 1))
+    token = _executor.set(executor)
+    try:
+        yield executor
+    finally:
+        _executor.reset(token)
+        executor.shutdown(wait=False)  # cancelled jobs' threads are not waited
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """
+    Run blocking function in the thread pool of the current concurrent block (see :func:`thread_pool`), so it
+    doesn't block other coroutines. Outside of such block nothing else runs concurrently and the function is called in
+    the calling thread: consecutive sync steps of a test run in the same thread (f.e. with thread-local connections).
+    """
+    executor = _executor.get()
+    if executor is None:
+        return func(*args, **kwargs)
+    # context (f.e. virtual user's state) is passed to the thread
+    context_run = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(executor, context_run)
+
+
+async def gather_limited(jobs: Iterable, limit: Optional[int] = None) -> list:
+    """
+    Run jobs (functions, which return coroutines) concurrently, not more than limit at a time.
+    Jobs are taken from the iterable only when there is a free slot, so it can be a generator.
+    Return their results in order of jobs. The first failure cancels all running jobs and is raised, next jobs are
+    never started. Jobs' sync functions run in a thread pool of `limit` threads.
+    """
+    if limit is None:
+        jobs = list(jobs)
+        limit = len(jobs)
+    with thread_pool(limit):
+        return await _gather_limited(jobs, limit)
+
+
+async def _gather_limited(jobs: Iterable, limit: int) -> list:
+    results = {}
+    running = set()
+
+    async def run(index, job):
+        results[index] = await job()
+
+    async def wait_running(return_when):
+        nonlocal running
+        done, running = await asyncio.wait(running, return_when=return_when)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+
+    try:
+        for i, job in enumerate(jobs):
+            if len(running) >= max(limit, 1):
+                await wait_running(asyncio.FIRST_COMPLETED)
+            running.add(asyncio.ensure_future(run(i, job)))
+        while running:
+            await wait_running(asyncio.FIRST_EXCEPTION)
+    except BaseException:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        raise
+    return [results[i] for i in range(len(results))]
@@ -78,7 +78,7 @@ def _prepare_cmd(file: str, args: list = None, variables=None, libraries=None) -
         cmd = [file]
     if args is not None:
         cmd += args
-    debug(str(cmd))
+    debug(lambda: str(cmd))
     return cmd, cwd
 
 
@@ -93,7 +93,7 @@ def _compile_java(file, variables, libraries=None):
         raise Exception("Can't compile {}. Out: {}, Err: {}".format(file, stdout, stderr))
     class_file = file_utils.find_resource(resource_dir, file_utils.get_filename(file), '.class')
     if len(class_file) > 1:
-        debug('Found more than 1 resource for {}: {}. Use last.'.format(file_utils.get_filename(file), class_file))
+        debug('Found more than 1 resource for {}: {}. Use last.', file_utils.get_filename(file), class_file)
         class_file = class_file[-1]
     else:
         class_file = class_file[0]
@@ -1,15 +1,21 @@
+import csv
 import inspect
 import io
 import json
 import ntpath
 import os
 import shutil
+from fnmatch import fnmatch
 from glob import glob
-from os.path import join
-from typing import List
+from typing import List, Optional, Iterator
 
 import yaml
 
+TEST_FILE_PATTERNS = ['*.yaml', '*.yml']
+
+# libyaml based loader is much faster, use it if available
+YAML_LOADER = getattr(yaml, 'CFullLoader', yaml.FullLoader)
+
 
 def get_module_filename(module) -> str:
     return get_filename(inspect.getfile(module))
@@ -36,20 +42,38 @@ def cut_part_path(tests_path, test_path):
 
 
 # Get list of yaml files in dir and subdirs
-def get_files(path: str) -> list:
+def get_files(path: str, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> list:
+    return list(iter_files(path, include=include, exclude=exclude))
+
+
+def iter_files(path: str, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> Iterator[str]:
+    """
+    Lazily find test files in dir and subdirs. File is returned if it's name matches any of include glob patterns
+    and neither it's name nor it's path relative to the root dir matches any of exclude patterns. Excluded
+    directories are not scanned.
+    """
     if not os.path.exists(path):
         raise FileNotFoundError('No such path: ' + path)
-    file = []
-    if os.path.isdir(path):
-        for f in os.listdir(path):
-            path_in_dir = join(path, f)
-            if os.path.isfile(path_in_dir) and (path_in_dir.endswith('yaml') or path_in_dir.endswith('yml')):
-                file.append(path_in_dir)
-            elif os.path.isdir(path_in_dir):
-                file += get_files(path_in_dir)
-    else:
-        file.append(path)
-    return file
+    if not os.path.isdir(path):
+        return iter([path])
+    return _scan_dir(path, path, include or TEST_FILE_PATTERNS, exclude or [])
+
+
+def _scan_dir(root: str, directory: str, include: List[str], exclude: List[str]) -> Iterator[str]:
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            relative = os.path.relpath(entry.path, root)
+            if _matches(entry.name, relative, exclude):
+                continue
+            if entry.is_file():
+                if _matches(entry.name, relative, include):
+                    yield entry.path
+            elif entry.is_dir():
+                yield from _scan_dir(root, entry.path, include, exclude)
+
+
+def _matches(name: str, relative: str, patterns: List[str]) -> bool:
+    return any(fnmatch(name, p) or fnmatch(relative, p) for p in patterns)
 
 
 def find_resource(path: str, resource_name: str, extension=".*") -> List[str]:
@@ -65,10 +89,18 @@ def find_resource(path: str, resource_name: str, extension=".*") -> List[str]:
 def read_source_file(file: str) -> dict:
     if not os.path.exists(file):
         raise FileNotFoundError('No such file: ' + file)
+    with open(file, 'r') as stream:
+        return parse_source(file, stream)
+
+
+def parse_source(file: str, stream) -> dict:
+    """
+    Parse json or yaml source (string or stream). File name is used to determine the format.
+    """
     if file.lower().endswith('json'):
-        return _read_json_file(file)
+        return _read_json_file(file, stream)
     else:
-        return _read_yaml_file(file)
+        return _read_yaml_file(file, stream)
 
 
 def read_file(file: str) -> str:
@@ -78,6 +110,36 @@ def read_file(file: str) -> str:
         return stream.read()
 
 
+def iter_lines(file: str) -> Iterator[str]:
+    """
+    Read file lazily line by line. Line endings are removed.
+    """
+    if not os.path.exists(file):
+        raise FileNotFoundError('No such file: ' + file)
+    with io.open(file, mode='r', encoding='utf-8') as stream:
+        for line in stream:
+            yield line.rstrip('\r\n')
+
+
+def iter_csv(file: str, delimiter: str = ',') -> Iterator[dict]:
+    """
+    Read csv file with headers lazily. Each row is a dict of header -> value.
+    """
+    if not os.path.exists(file):
+        raise FileNotFoundError('No such file: ' + file)
+    with io.open(file, mode='r', encoding='utf-8', newline='') as stream:
+        yield from csv.DictReader(stream, delimiter=delimiter)
+
+
+def iter_json_lines(file: str) -> Iterator:
+    """
+    Read json-lines file lazily. Each not empty line is parsed as a separate json object.
+    """
+    for line in iter_lines(file):
+        if line.strip():
+            yield json.loads(line)
+
+
 # If dir exists delete and and create again
 def ensure_empty(path: str):
     remove_dir(path)
@@ -94,17 +156,17 @@ def ensure_dir(path: str):
         os.makedirs(path)
 
 
-def _read_yaml_file(file: str) -> dict:
-    with open(file, 'r') as stream:
-        try:
-            return yaml.load(stream, Loader=yaml.FullLoader) or {}
-        except yaml.YAMLError as exc:
-            raise yaml.YAMLError('Wrong YAML format for file ' + file + ' : ' + str(exc))
+def _read_yaml_file(file: str, stream) -> dict:
+    try:
+        return yaml.load(stream, Loader=YAML_LOADER) or {}
+    except yaml.YAMLError as exc:
+        raise yaml.YAMLError('Wrong YAML format for file ' + file + ' : ' + str(exc))
 
 
-def _read_json_file(file: str) -> dict:
-    with open(file, 'r') as stream:
-        try:
-            return json.load(stream) or {}
-        except yaml.YAMLError as exc:
-            raise yaml.YAMLError('Wrong YAML format for file ' + file + ' : ' + str(exc))
+def _read_json_file(file: str, stream) -> dict:
+    try:
+        if isinstance(stream, str):
+            return json.loads(stream) or {}
+        return json.load(stream) or {}
+    except yaml.YAMLError as exc:
+        raise yaml.YAMLError('Wrong YAML format for file ' + file + ' : ' + str(exc))
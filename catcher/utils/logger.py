@@ -1,5 +1,6 @@
+import io
 import logging
-from contextlib import ContextDecorator
+from contextlib import ContextDecorator, contextmanager
 from logging import Logger
 
 import catcher
@@ -26,6 +27,24 @@ class OptionalOutput(ContextDecorator):
             output_enabled = True
 
 
+@contextmanager
+def buffered_output():
+    """
+    Collect all console output in the buffer instead of printing it.
+    Is used by parallel runner's workers to keep each test's output grouped.
+    """
+    buffer = io.StringIO()
+    handler = logging.StreamHandler(buffer)
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    root = logging.getLogger()
+    old_handlers = root.handlers
+    root.handlers = [handler]
+    try:
+        yield buffer
+    finally:
+        root.handlers = old_handlers
+
+
 def blue(output: str) -> str:
     return Fore.BLUE + output + Style.RESET_ALL if colored_output else output
 
@@ -70,39 +89,45 @@ def get_logger() -> Logger:
     return logging.getLogger(catcher.APPNAME)
 
 
-def debug(msg: str):
-    if logging.DEBUG >= logging.root.level:
-        log_storage.output('debug', msg)
-    if output_enabled:
-        get_logger().debug(_nested_output(msg))
+def debug(msg, *args):
+    _log(logging.DEBUG, 'debug', msg, args)
+
+
+def info(msg, *args):
+    _log(logging.INFO, 'info', msg, args)
 
 
-def info(msg: str):
-    if logging.INFO >= logging.root.level:
-        log_storage.output('info', msg)
-    if output_enabled:
-        get_logger().info(_nested_output(msg))
+def warning(msg, *args):
+    _log(logging.WARNING, 'warning', msg, args)
 
 
-def warning(msg: str):
-    if logging.WARNING >= logging.root.level:
-        log_storage.output('warning', msg)
-    if output_enabled:
-        get_logger().warning(_nested_output(msg))
+def error(msg, *args):
+    _log(logging.ERROR, 'error', msg, args)
 
 
-def error(msg: str):
-    if logging.ERROR >= logging.root.level:
-        log_storage.output('error', msg)
-    if output_enabled:
-        get_logger().error(_nested_output(msg))
+def critical(msg, *args):
+    _log(logging.CRITICAL, 'critical', msg, args)
 
 
-def critical(msg: str):
-    if logging.CRITICAL >= logging.root.level:
-        log_storage.output('critical', msg)
-    if output_enabled:
-        get_logger().critical(_nested_output(msg))
+def _log(level: int, level_name: str, msg, args: tuple):
+    """
+    Send message to the log storage and to the console, if this level is enabled.
+    Message is formed only when it is needed: `msg` can be a function without arguments, which returns the message,
+    or a format string for `args`: debug('Got {}', response.text) or debug(lambda: 'Got ' + response.text).
+    The function is called right away, f.e. debug(lambda: traceback.format_exc()) in except block.
+    """
+    to_storage = level >= logging.root.level
+    to_console = output_enabled and get_logger().isEnabledFor(level)
+    if not to_storage and not to_console:
+        return
+    if callable(msg):
+        msg = msg()
+    elif args:
+        msg = msg.format(*args)
+    if to_storage:
+        log_storage.output(level_name, msg)
+    if to_console:
+        get_logger().log(level, _nested_output(msg))
 
 
 def _nested_output(msg):
@@ -1,21 +1,82 @@
 import ast
+import builtins
 import datetime
 import json
 import random
+import re
+import threading
 import time
 import uuid
+from collections import OrderedDict, ChainMap
+from collections.abc import Mapping
+from copy import deepcopy
+from functools import lru_cache
 # noinspection PyUnresolvedReferences
 from uuid import UUID  # for UUID as object parsing
 from collections.abc import Iterable
 from types import ModuleType
 from typing import Union
 
-from jinja2 import Template, UndefinedError
+from jinja2 import Environment, Template, Undefined, UndefinedError
 
 from catcher.utils import module_utils
 from catcher.utils.logger import debug
 from catcher.core.filters_factory import FiltersFactory
 
+TEMPLATE_CACHE_SIZE = 4096
+LITERAL_CACHE_SIZE = 4096
+MAX_CACHED_TERM = 4096  # longer strings (f.e. rendered big responses) are parsed every time, not to keep them in memory
+IMMUTABLE_TYPES = (str, int, float, bool, complex, type(None))
+NATIVE_TYPES = (list, dict, tuple, int, float, bool, type(None))  # kept as is by native rendering
+
+_newline_re = re.compile(r'(\r\n|\r|\n)')
+
+
+class TemplateCache:
+    """
+    Bounded LRU cache of compiled templates, keyed by template source.
+    Is bound to the jinja environment and is cleared if the environment changes.
+    """
+
+    def __init__(self, max_size: int = TEMPLATE_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._environment = None
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, source: str, environment: Environment) -> Template:
+        with self._lock:
+            if environment is not self._environment:
+                self._templates.clear()
+                self._environment = environment
+            template = self._templates.get(source)
+            if template is not None:
+                self.hits += 1
+                self._templates.move_to_end(source)
+                return template
+            self.misses += 1
+        template = environment.from_string(source)
+        with self._lock:
+            self._templates[source] = template
+            if len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+        return template
+
+    def info(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._templates), 'max_size': self.max_size}
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_templates = TemplateCache()
+_native_templates = TemplateCache()
+
 
 def merge_two_dicts(x, y):
     if not x:
@@ -44,7 +105,7 @@ def try_get_objects(source: str or dict or list):
 def try_get_object(source: str or dict or list):
     if isinstance(source, str):
         try:  # try python term '{key: "value"}'
-            evaled = eval_datetime(source)
+            evaled = eval_expression(source)
             if isinstance(evaled, ModuleType) or callable(evaled):  # for standalone 'string' var or 'id' bif
                 return source
             source = evaled
@@ -56,43 +117,196 @@ def try_get_object(source: str or dict or list):
     return source
 
 
-def fill_template_recursive(source: Union[dict, list, str], variables: dict, glob=None, globs_added=None) \
-        -> Union[dict, list, str]:
+def is_template(source: str) -> bool:
+    """
+    Check if string has any jinja markup and should be rendered.
+    """
+    return '{{' in source or '{%' in source or '{#' in source
+
+
+def render_static(source: str) -> str:
+    """
+    Output of a string without jinja markup, the same as jinja would render it: newlines are normalized
+    and the trailing one is dropped.
+    """
+    if '\r' in source:
+        lines = _newline_re.split(source)[::2]
+        if lines[-1] == '':
+            del lines[-1]
+        return '\n'.join(lines)
+    if source.endswith('\n'):
+        return source[:-1]
+    return source
+
+
+TEXT, LITERAL, EXPRESSION = 'text', 'literal', 'expression'
+
+_not_importable = set()  # names, which failed to be imported as modules (f.e. bare words like `John` or `active`)
+_CALLABLE_BUILTINS = frozenset(k for k, v in vars(builtins).items() if callable(v))  # `id`, `type`: never values
+
+
+def clear_import_cache():
+    """
+    Forget names, which failed to be imported (f.e. after new packages were installed).
+    """
+    _not_importable.clear()
+
+
+def compile_term(source: str) -> tuple:
+    """
+    Parse a string once and return it's kind with the value:
+    (LITERAL, value) for python literals, (EXPRESSION, code) for other python expressions (names, calls, etc),
+    compiled to be evaluated later, and (TEXT, None) for everything else, which is just a string.
+    Strings longer than MAX_CACHED_TERM are not cached.
+    """
+    if len(source) > MAX_CACHED_TERM:
+        return _compile_term(source)
+    return _compile_term_cached(source)
+
+
+def _compile_term(source: str) -> tuple:
+    try:
+        tree = ast.parse(source, mode='eval')
+    except (SyntaxError, ValueError, MemoryError, RecursionError):
+        return TEXT, None  # not a python term (or a statement) - just a string
+    try:
+        return LITERAL, format_datetime(ast.literal_eval(tree.body))
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        pass
+    try:
+        return EXPRESSION, compile(tree, '<expression>', 'eval')
+    except (SyntaxError, ValueError, MemoryError, RecursionError):
+        return TEXT, None
+
+
+_compile_term_cached = lru_cache(maxsize=LITERAL_CACHE_SIZE)(_compile_term)
+
+
+def fill_static(source: str, glob=None) -> tuple:
+    """
+    Get the value of a rendered string without templates. Return (True, value) if it is a plain string or a python
+    literal, which is the same as fill_template would return. Return (False, None) for expressions, which should be
+    evaluated. Literal's value is parsed only once and then is taken from the cache.
+    A bare word, which failed to be imported before or is a builtin function's name, is a plain string too.
+    """
+    kind, value = compile_term(source)
+    if kind == TEXT:
+        return True, source
+    if kind == EXPRESSION:
+        if (source in _not_importable or source in _CALLABLE_BUILTINS) \
+                and source not in (globals() if glob is None else glob):
+            return True, source
+        return False, None
+    if not isinstance(value, IMMUTABLE_TYPES):
+        value = deepcopy(value)  # do not share mutable cached values
+    return True, value
+
+
+def eval_expression(source: str, glob=None, import_missing=False):
+    """
+    Get the value of a python term. Literals are taken from the cache, expressions are compiled only once and are
+    evaluated every time. With import_missing unknown names are imported as modules (f.e. psycopg2.tz for
+    tzinfo=psycopg2.tz.FixedOffsetTimezone) and expression is evaluated again. Names, which failed to be imported,
+    are not imported again.
+    Raise ValueError if source is not a python term.
+    """
+    kind, value = compile_term(source)
+    if kind == TEXT:
+        raise ValueError(source)
+    if kind == LITERAL:
+        return value if isinstance(value, IMMUTABLE_TYPES) else deepcopy(value)
+    if glob is None:
+        glob = globals()
+    imported = set()
+    while True:
+        try:
+            return eval(value, glob)
+        except NameError as e:
+            name = getattr(e, 'name', None) or str(e).split("'")[1]
+            if not import_missing or name in imported or name in _not_importable:
+                raise
+            glob = module_utils.add_package_to_globals(name, glob, warn_missing_package=False)
+            imported.add(name)
+            if name not in glob:
+                _not_importable.add(name)
+                raise
+
+
+def fill_template_recursive(source: Union[dict, list, str], variables: dict, glob=None) -> Union[dict, list, str]:
+    """
+    Fill templates in all strings (keys and values) of the data structure in a single pass. Containers, which
+    have nothing changed inside (f.e. have no templates), are returned as they are, without copying.
+    """
     if isinstance(source, dict):
-        return dict([(fill_template_recursive(k, variables, glob, globs_added),
-                      fill_template_recursive(v, variables, glob, globs_added)) for k, v in source.items()])
+        filled = [(fill_template_recursive(k, variables, glob), fill_template_recursive(v, variables, glob))
+                  for k, v in source.items()]
+        if all(fk is k and fv is v for (k, v), (fk, fv) in zip(source.items(), filled)):
+            return source
+        return dict(filled)
     if isinstance(source, list):
-        return [fill_template_recursive(v, variables, glob, globs_added) for v in source]
-    return fill_template(source, variables, glob, globs_added)
+        filled = [fill_template_recursive(v, variables, glob) for v in source]
+        if all(f is v for v, f in zip(source, filled)):
+            return source
+        return filled
+    return fill_template(source, variables, glob=glob)
 
 
-def fill_template(source: str, variables: dict, isjson=False, glob=None, globs_added=None) -> str:
-    if not globs_added:
-        globs_added = set()
+def fill_template(source: str, variables: dict, isjson=False, glob=None) -> str:
     if isinstance(source, str):
-        source = render(source, inject_builtins(variables))
+        if is_template(source):
+            source = render(source, inject_builtins(variables))
+        else:
+            source = render_static(source)
+            if not isjson:
+                parsed, value = fill_static(source, glob)
+                if parsed:
+                    return value
         if isjson:  # do not parse json string back to objects
             return source
-        try:
-            evaled = format_datetime(eval_datetime(source, glob))
-            if not isinstance(evaled, ModuleType) and not callable(evaled):  # for standalone 'string' var or 'id' bif
-                source = evaled
-        except NameError as e:  # try to import missing package and rerun this code
-            if 'is not defined' in str(e):
-                name = str(e).split("'")[1]
-                if name not in globs_added:
-                    # f.e. tzinfo=psycopg2.tz.FixedOffsetTimezone for datetime
-                    glob = module_utils.add_package_to_globals(name, glob, warn_missing_package=False)
-                    globs_added.add(name)
-                    filled = fill_template(source, variables, isjson, glob=glob, globs_added=globs_added)
-                    if not isinstance(filled, ModuleType) and not callable(filled):
-                        return filled  # for standalone 'string' var or 'id' bif
-        except Exception:
-            pass
+        return _eval_rendered(source, glob)
+    return source
+
+
+def fill_template_native(source: any, variables: dict) -> any:
+    """
+    Fill the template, keeping rendered python objects as they are: `'{{ big_list }}'` returns the list from the
+    variables itself (by reference), without converting it to a string and parsing back. Strings and other objects
+    are typed the same way as by fill_template.
+    """
+    if not isinstance(source, str) or not is_template(source):
+        return fill_template(source, variables)
+    value = render_native(source, inject_builtins(variables))
+    if isinstance(value, Undefined):
+        return ''
+    if isinstance(value, NATIVE_TYPES):
+        return value
+    return _eval_rendered(str(value))
+
+
+def fill_template_object(source: any, variables: dict) -> any:
+    """
+    Fill templates in the data structure (or a template of it) and return it as python object.
+    """
+    if isinstance(source, str):
+        filled = fill_template_native(source, variables)
+        return try_get_objects(filled) if isinstance(filled, str) else filled  # f.e. json list in a string
+    return fill_template_recursive(source, variables)
+
+
+def _eval_rendered(source: str, glob=None) -> any:
+    try:
+        evaled = format_datetime(eval_expression(source, glob, import_missing=True))
+        if not isinstance(evaled, ModuleType) and not callable(evaled):  # for standalone 'string' var or 'id' bif
+            return evaled
+    except Exception:
+        pass
     return source
 
 
 def fill_template_str(source: any, variables: dict) -> str:
+    source = str(source)
+    if not is_template(source):
+        return render_static(source)
     rendered = render(str(source), inject_builtins(variables))
     if rendered != source:
         return fill_template_str(rendered, variables)
@@ -100,20 +314,7 @@ def fill_template_str(source: any, variables: dict) -> str:
 
 
 def eval_datetime(astr, glob=None):
-    if glob is None:
-        glob = globals()
-    try:
-        tree = ast.parse(astr)
-    except SyntaxError:
-        raise ValueError(astr)
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.Module, ast.Expr, ast.Dict, ast.Str,
-                             ast.Attribute, ast.Num, ast.Name, ast.Load, ast.Tuple)): continue
-        if (isinstance(node, ast.Call)
-                and isinstance(node.func, ast.Attribute)
-                and node.func.attr == 'datetime'): continue
-        pass
-    return eval(astr, glob)
+    return eval_expression(astr, glob)
 
 
 def format_datetime(iterable):
@@ -129,25 +330,73 @@ def format_datetime(iterable):
         return [format_datetime(i) for i in iterable]
 
 
-def inject_builtins(variables: dict) -> dict:
-    variables_copy = dict(variables)
-    variables_copy['RANDOM_STR'] = str(uuid.uuid4())
-    variables_copy['RANDOM_INT'] = random.randint(-2147483648, 2147483648)
-    ts = round(time.time(), 6)  # from timestamp uses rounding, so we should also use it here, to make them compatible
-    variables_copy['NOW_TS'] = ts
-    variables_copy['NOW_DT'] = datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%dT%H:%M:%S0+0000')
-    return variables_copy
+class BuiltinVariables(Mapping):
+    """
+    Built-in variables, available in every template. Each value is computed only when a template refers to it
+    and stays the same during one render.
+    """
+    KEYS = ('RANDOM_STR', 'RANDOM_INT', 'NOW_TS', 'NOW_DT')
+
+    def __init__(self) -> None:
+        self._computed = {}
+
+    def __getitem__(self, key):
+        if key not in self._computed:
+            if key == 'RANDOM_STR':
+                self._computed[key] = str(uuid.uuid4())
+            elif key == 'RANDOM_INT':
+                self._computed[key] = random.randint(-2147483648, 2147483648)
+            elif key in ('NOW_TS', 'NOW_DT'):
+                # from timestamp uses rounding, so we should also use it here, to make them compatible
+                ts = round(time.time(), 6)
+                self._computed['NOW_TS'] = ts
+                self._computed['NOW_DT'] = datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%dT%H:%M:%S0+0000')
+            else:
+                raise KeyError(key)
+        return self._computed[key]
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+
+def inject_builtins(variables: dict) -> Mapping:
+    """
+    Overlay variables with built-ins without copying them. Built-ins override variables with the same name.
+    """
+    return ChainMap(BuiltinVariables(), variables)
+
+
+def template_cache_info() -> dict:
+    """
+    Compiled templates cache statistics: hits, misses, current and max size.
+    """
+    return _templates.info()
 
 
 def render(source: str, variables: dict) -> str:
-    template = Template(source)
-    holder = FiltersFactory()
-    for filter_mod, value in holder.filters.items():
-        template.environment.filters[filter_mod] = value
-    for fun_mod, value in holder.functions.items():
-        template.globals[fun_mod] = value
+    return _render(_templates.get(source, FiltersFactory().environment), source, variables)
+
+
+def render_native(source: str, variables: dict) -> any:
+    """
+    Render the template to a python object. See fill_template_native.
+    """
+    return _render(_native_templates.get(source, FiltersFactory().native_environment), source, variables)
+
+
+def _render(template: Template, source: str, variables: dict) -> any:
+    # shared context uses variables' mapping as is, without copying it, so globals are added as the last layer
+    context = template.new_context(ChainMap(variables, template.globals), shared=True)
     try:
-        return template.render(variables)
+        return template.environment.concat(template.root_render_func(context))
     except UndefinedError as e:
         debug(e.message)
         return source
+    except Exception:
+        template.environment.handle_exception()
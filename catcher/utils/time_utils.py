@@ -1,3 +1,5 @@
+import time
+
 TIME_MAPPING = [
     ('days', 86400),
     ('hours', 3600),
@@ -15,3 +17,26 @@ def to_seconds(body: dict) -> int:
 
 def compute_time(key: str, body: dict, to_second: float) -> int:
     return body.get(key, 0) * to_second
+
+
+def start_timer() -> tuple:
+    """
+    Current monotonic wall clock and process CPU time in nanoseconds. Pass it to :func:`elapsed_ns` later.
+    """
+    return time.monotonic_ns(), time.process_time_ns()
+
+
+def elapsed_ns(timer: tuple) -> dict:
+    """
+    Wall clock and CPU nanoseconds passed since the timer was started.
+    """
+    wall, cpu = timer
+    return {'wall_ns': time.monotonic_ns() - wall, 'cpu_ns': time.process_time_ns() - cpu}
+
+
+def format_ns(nanoseconds: int) -> str:
+    seconds = nanoseconds / 1e9
+    if seconds > 60:
+        minutes, seconds = divmod(round(seconds), 60)
+        return '{}m {}s'.format(minutes, seconds)
+    return '{:.3f}s'.format(seconds)
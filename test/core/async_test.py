@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from os.path import join
+
+from catcher.core.runner import Runner
+from catcher.steps.step import Step, update_variables
+from catcher.utils.async_utils import run_sync, gather_limited, thread_pool
+from catcher.utils.misc import fill_template
+from test.abs_test_class import TestClass
+from test.test_utils import check_file
+
+
+class AsyncSleep(Step):
+    """
+    Async step for tests: sleep without blocking the event loop and return the value.
+    """
+
+    def __init__(self, value=None, seconds=0, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.value = value
+        self.seconds = seconds
+
+    @update_variables
+    async def action(self, includes: dict, variables: dict) -> tuple:
+        await asyncio.sleep(self.seconds)
+        return variables, fill_template(self.value, variables)
+
+
+class ThreadIdent(Step):
+    """
+    Sync step for tests: return the thread it was run in.
+    """
+
+    def action(self, includes: dict, variables: dict) -> tuple:
+        return variables, threading.get_ident()
+
+
+class CurrentThread(Step):
+    """
+    Sync step for tests: register the thread it was run in.
+    """
+
+    @update_variables
+    def action(self, includes: dict, variables: dict) -> tuple:
+        return variables, threading.get_ident()
+
+
+class Sleep(Step):
+    """
+    Sync step for tests: block the thread for some time.
+    """
+
+    def __init__(self, seconds=0, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.seconds = seconds
+
+    def action(self, includes: dict, variables: dict) -> tuple:
+        time.sleep(self.seconds)
+        return variables, self.seconds
+
+
+class AsyncTest(TestClass):
+    def __init__(self, method_name):
+        super().__init__('async_test', method_name)
+
+    # async steps are awaited and their output is registered as for sync steps
+    def test_async_step(self):
+        self.populate_file('main.yaml', '''---
+        variables:
+            foo: bar
+        steps:
+            - asyncsleep: {value: '{{ foo }}', register: {baz: '{{ OUTPUT }}'}}
+            - echo: {from: '{{ baz }}', to: main.output}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), 'bar'))
+
+    # async step can be run by the sync step (loop) and from the included test
+    def test_async_step_nested(self):
+        self.populate_file('main.yaml', '''---
+        include:
+            file: one.yaml
+            as: one
+        steps:
+            - run: one
+            - loop:
+                foreach:
+                    in: [1, 2, 3]
+                    do:
+                        asyncsleep: {value: '{{ ITEM + counter }}', register: {counter: '{{ OUTPUT }}'}}
+            - echo: {from: '{{ counter }}', to: main.output}
+        ''')
+        self.populate_file('one.yaml', '''---
+        steps:
+            - asyncsleep: {value: 10, register: {counter: '{{ OUTPUT }}'}}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), '16'))
+
+    # hundreds of async actions run concurrently in one thread, sync ones are run in the thread pool
+    def test_concurrent_actions(self):
+        steps = [AsyncSleep(value=i, seconds=0.2) for i in range(500)]
+
+        async def run_all():
+            with thread_pool(1):
+                return await asyncio.gather(*[s.run_action_async({}, {}) for s in steps],
+                                            ThreadIdent().run_action_async({}, {}))
+
+        start = time.monotonic()
+        results = run_sync(run_all())
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(501, len(results))
+        self.assertNotEqual(threading.get_ident(), results[-1][1])
+
+    # all sync jobs run at the same time, not limited by the default executor's size
+    def test_gather_limited_threads(self):
+        async def run_all():
+            return await gather_limited([lambda: Sleep(seconds=0.2).run_action_async({}, {}) for _ in range(100)], 100)
+
+        start = time.monotonic()
+        self.assertEqual(100, len(run_sync(run_all())))
+        self.assertLess(time.monotonic() - start, 0.6)  # default executor has not more than 32 threads
+
+    # sync steps of a test are run in the calling thread, if they are not run concurrently
+    def test_sync_steps_same_thread(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - currentthread: {register: {first: '{{ OUTPUT }}'}}
+            - currentthread: {register: {second: '{{ OUTPUT }}'}}
+            - echo: {from: '{{ first }} {{ second }}', to: main.output}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        ident = str(threading.get_ident())
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), ident + ' ' + ident))
@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import join
+
+from catcher.core.bench import Bench, run_bench, latency_summary
+from catcher.core.runner import Runner
+from test.abs_test_class import TestClass
+
+
+class BenchTest(TestClass):
+    def __init__(self, method_name):
+        super().__init__('bench_test', method_name)
+
+    # every iteration is timed, steps are identified by name
+    def test_iterations(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - echo: {from: 'hello', name: 'say hello'}
+            - wait: {seconds: 0.05, name: 'sleep'}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        stats = Bench(runner, iterations=10, users=5).run().summary()
+        self.assertEqual(10, stats['iterations'])
+        self.assertEqual(0, stats['failed'])
+        self.assertEqual(10, stats['steps']['say hello']['count'])
+        self.assertEqual(10, stats['steps']['sleep']['count'])
+        self.assertGreaterEqual(stats['steps']['sleep']['p50'], 0.05)
+        self.assertLess(stats['elapsed'], 0.5)  # 5 users at the same time
+
+    # users and iterations don't see each other's variables
+    def test_isolated_variables(self):
+        self.populate_file('main.yaml', '''---
+        variables:
+            counter: 0
+        steps:
+            - echo: {from: '{{ counter + 1 }}', register: {counter: '{{ OUTPUT }}'}}
+            - wait: {seconds: 0.01}
+            - check: '{{ counter == 1 }}'
+            - echo: {from: '{{ USER }} {{ ITERATION }}', register: {user: '{{ OUTPUT }}'}}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        stats = Bench(runner, iterations=20, users=4).run().summary()
+        self.assertEqual(20, stats['iterations'])
+        self.assertEqual(0, stats['failed'])
+
+    # failed iterations are counted, test is not stopped
+    def test_errors(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - check: {equals: {the: '{{ ITERATION % 2 }}', is: 0}, name: 'even'}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        stats = Bench(runner, iterations=10, users=2).run().summary()
+        self.assertEqual(5, stats['failed'])
+        self.assertEqual(0.5, stats['error_rate'])
+        self.assertEqual(5, stats['steps']['even']['errors'])
+
+    # duration and rps limit the number of iterations
+    def test_duration_rps(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - echo: 'hello'
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        start = time.monotonic()
+        stats = Bench(runner, duration=0.5, users=2, rps=20).run().summary()
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(8 <= stats['iterations'] <= 11)
+
+    # sync steps of all users run at the same time, latency is not a queue time
+    def test_sync_steps_concurrency(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - sh: {command: 'sleep 0.3', name: 'sleep'}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        stats = Bench(runner, iterations=50, users=50).run().summary()
+        self.assertEqual(0, stats['failed'])
+        self.assertLess(stats['elapsed'], 0.9)
+        self.assertLess(stats['steps']['sleep']['p99'], 0.9)
+
+    # every user has it's own http session with it's own cookies
+    def test_isolated_sessions(self):
+        class CookieHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                if self.path.startswith('/login/'):
+                    self.send_header('Set-Cookie', 'user={}; Path=/'.format(self.path.split('/')[-1]))
+                self.end_headers()
+                self.wfile.write(str(self.headers.get('Cookie')).encode())
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('localhost', 0), CookieHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.populate_file('main.yaml', '''---
+        steps:
+            - http: {get: {url: 'http://localhost:{{ port }}/login/{{ USER }}'}}
+            - wait: {seconds: 0.1}
+            - http: {get: {url: 'http://localhost:{{ port }}/whoami'}, register: {cookie: '{{ OUTPUT }}'}}
+            - check: {equals: {the: '{{ cookie }}', is: 'user={{ USER }}'}}
+        ''')
+        try:
+            runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None,
+                            cmd_env={'port': str(server.server_address[1])})
+            stats = Bench(runner, iterations=5, users=5).run().summary()
+        finally:
+            server.shutdown()
+        self.assertEqual(5, stats['iterations'])
+        self.assertEqual(0, stats['failed'])
+
+    # users with failed includes are reported and fail the bench
+    def test_includes_failed(self):
+        self.populate_file('main.yaml', '''---
+        include: include.yaml
+        steps:
+            - echo: 'hello'
+        ''')
+        self.populate_file('include.yaml', '''---
+        steps:
+            - check: '{{ 1 == 2 }}'
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        with self.assertLogs('catcher', 'WARNING') as logs:
+            self.assertFalse(run_bench(runner, users=2, report=join(self.test_dir, 'reports', 'bench.json')))
+        self.assertEqual(2, len([line for line in logs.output if 'includes failed' in line]))
+        with open(join(self.test_dir, 'reports', 'bench.json')) as f:
+            stats = json.load(f)
+        self.assertEqual(0, stats['iterations'])
+        self.assertEqual(2, stats['setup_failed'])
+
+    def test_json_report(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - echo: 'hello'
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(run_bench(runner, iterations=3, report=join(self.test_dir, 'reports', 'bench.json')))
+        with open(join(self.test_dir, 'reports', 'bench.json')) as f:
+            stats = json.load(f)
+        self.assertEqual(3, stats['iterations'])
+        self.assertEqual({'count', 'errors', 'error_rate', 'p50', 'p90', 'p99', 'max', 'mean'},
+                         set(stats['steps']['echo'].keys()))
+
+    def test_percentiles(self):
+        summary = latency_summary([i / 100 for i in range(1, 101)])
+        self.assertEqual(0.5, summary['p50'])
+        self.assertEqual(0.9, summary['p90'])
+        self.assertEqual(0.99, summary['p99'])
+        self.assertEqual(1, summary['max'])
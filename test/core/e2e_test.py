@@ -1,3 +1,4 @@
+import json
 import os
 import subprocess
 from os.path import join
@@ -20,6 +21,7 @@ class E2ETest(TestClass):
         super().tearDown()
         file_utils.remove_dir(join(os.getcwd(), TEST_DIR, 'steps'))
         file_utils.remove_dir(join(os.getcwd(), TEST_DIR, 'reports'))
+        file_utils.remove_dir(join(os.getcwd(), TEST_DIR, '.cache'))
 
     def test_can_run(self):
         self.populate_file('main.yaml', '''---
@@ -253,6 +255,41 @@ class E2ETest(TestClass):
         self.assertEqual('INFO:catcher:Test run 1. Success: 0, Fail: 1. Total: 0%', lines[-2])
         self.assertEqual('Test main: fail, on step 0', lines[-1])
 
+    def test_bench(self):
+        self.populate_file('main.yaml', '''---
+                steps:
+                    - echo: {from: 'hello', name: 'say hello'}
+                ''')
+        report = join(self.test_dir, 'bench.json')
+        output = self._run_test('bench ' + join(self.test_dir, 'main.yaml') + ' -n 4 -c 2 --no-color --no-cache -o ' + report)
+        self.assertTrue('Iterations: 4, Failed: 0' in output)
+        self.assertTrue(os.path.exists(report))
+
+    # parsed tests are cached in the user's cache directory, not in the current one
+    def test_parse_cache_dir(self):
+        self.populate_file('main.yaml', '''---
+                steps:
+                    - echo: {from: 'hello'}
+                ''')
+        self._run_test(self.test_dir)
+        self.assertEqual(1, len(os.listdir(join(os.getcwd(), TEST_DIR, '.cache', 'catcher'))))
+        self.assertFalse(os.path.exists(join(os.getcwd(), TEST_DIR, '.catcher_cache')))
+
+    def test_build_report(self):
+        self.populate_file('main.yaml', '''---
+                steps:
+                    - echo: {from: 'hello', register: {foo: 'bar'}}
+                ''')
+        self._run_test(self.test_dir + ' -p jsonl --variables-delta')
+        reports_dir = join(os.getcwd(), TEST_DIR, 'reports')
+        [jsonl] = [f for f in os.listdir(reports_dir) if f.endswith('.jsonl')]
+        self._run_test('report ' + join(reports_dir, jsonl) + ' -p json')
+        [report] = [f for f in os.listdir(reports_dir) if f.endswith('.json')]
+        with open(join(reports_dir, report)) as f:
+            [test] = [t for t in json.load(f) if t.get('type') == 'test']
+        self.assertEqual('OK', test['status'])
+        self.assertEqual({'foo': 'bar'}, [o for o in test['output'] if 'success' in o][0]['variables'])
+
     def test_run_output_limited(self):
         pass
 
@@ -264,6 +301,7 @@ class E2ETest(TestClass):
                                    cwd=join(os.getcwd(), TEST_DIR),
                                    stdout=subprocess.PIPE,
                                    stderr=subprocess.PIPE,
+                                   env={**os.environ, 'XDG_CACHE_HOME': join(os.getcwd(), TEST_DIR, '.cache')},
                                    universal_newlines=True)
         stdout, stderr = process.communicate()
         if expected_code != process.returncode:
@@ -1,5 +1,6 @@
 import ipaddress
 import random
+import sys
 from os.path import join
 
 import pytest
@@ -39,12 +40,25 @@ class FiltersTest(TestClass):
                     - echo: {from: '{{ random_choice(my_list) }}', to: three.output}
                 ''')
         runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        random.seed(123)
+        expected_int = random.randint(1, 10)
+        expected_choice = random.choice(['one', 'two', 'three'])
         Faker.seed(4321)
         random.seed(123)
         self.assertTrue(runner.run_tests())
         ipaddress.ip_address(read_file(join(self.test_dir, 'one.output')))
-        self.assertTrue(check_file(join(self.test_dir, 'two.output'), '1'))
-        self.assertTrue(check_file(join(self.test_dir, 'three.output'), 'three'))
+        self.assertTrue(check_file(join(self.test_dir, 'two.output'), str(expected_int)))
+        self.assertTrue(check_file(join(self.test_dir, 'three.output'), expected_choice))
+
+    def test_random_many(self):
+        self.populate_file('main.yaml', '''---
+                steps:
+                    - echo: {from: '{{ random_many("email", 100) }}', register: {emails: '{{ OUTPUT }}'}}
+                    - check: {equals: {the: '{{ emails | length }}', is: 100}}
+                    - check: {equals: {the: '{{ random("email") is string }}', is: true}}
+                ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
 
     def test_custom_filters_available(self):
         self.populate_file('custom_filter.py',
@@ -219,8 +233,10 @@ def _not_a_fun(arg):
         ''')
         runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
         random.seed(123)
+        expected = random.choice(['one', 'two', 'three'])
+        random.seed(123)
         self.assertTrue(runner.run_tests())
-        self.assertTrue(check_file(join(self.test_dir, 'one.output'), 'three'))
+        self.assertTrue(check_file(join(self.test_dir, 'one.output'), expected))
 
     # random int with args can be called
     def test_random_int(self):
@@ -230,8 +246,10 @@ def _not_a_fun(arg):
         ''')
         runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
         random.seed(123)
+        expected = random.randint(1, 10)
+        random.seed(123)
         self.assertTrue(runner.run_tests())
-        self.assertTrue(check_file(join(self.test_dir, 'one.output'), '9'))
+        self.assertTrue(check_file(join(self.test_dir, 'one.output'), str(expected)))
 
         # no upper limit
         self.populate_file('main.yaml', '''---
@@ -240,8 +258,10 @@ def _not_a_fun(arg):
         ''')
         runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
         random.seed(123)
+        expected = random.randint(1, sys.maxsize)
+        random.seed(123)
         self.assertTrue(runner.run_tests())
-        self.assertTrue(check_file(join(self.test_dir, 'one.output'), '5186474716495645053'))
+        self.assertTrue(check_file(join(self.test_dir, 'one.output'), str(expected)))
 
         # no lower limit
         self.populate_file('main.yaml', '''---
@@ -250,8 +270,10 @@ def _not_a_fun(arg):
         ''')
         runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
         random.seed(123)
+        expected = random.randint(-sys.maxsize - 1, 1)
+        random.seed(123)
         self.assertTrue(runner.run_tests())
-        self.assertTrue(check_file(join(self.test_dir, 'one.output'), '-2936754363331581815'))
+        self.assertTrue(check_file(join(self.test_dir, 'one.output'), str(expected)))
 
     # faker can be called from catcher
     def test_random_functions(self):
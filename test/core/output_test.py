@@ -1,8 +1,11 @@
 import json
 from os import listdir
-from os.path import join, isfile
+from os.path import join, isfile, basename
 
 from catcher.core.runner import Runner
+from catcher.modules.formatter import expand_variables
+from catcher.modules.log_storage import read_report, LogStorage
+from catcher.utils import logger
 from test.abs_test_class import TestClass
 
 
@@ -103,6 +106,7 @@ class OutputTest(TestClass):
             self.assertEqual(sorted(['CURRENT_DIR', 'RESOURCES_DIR', 'TEST_NAME', 'user']),
                              sorted(list(steps[1]['variables'].keys())))
             self.assertEqual('val', steps[1]['variables']['user'])
+            self.assertFalse('variables_delta' in report)
 
     def test_run_multiple_tests(self):
         self.populate_file('first.yaml', '''---
@@ -291,6 +295,137 @@ class OutputTest(TestClass):
             self.assertEqual('echo', list(steps[0]['step']['wait']['for'][0].keys())[0])
             self.assertEqual('echo', list(steps[0]['step']['wait']['for'][1].keys())[0])
 
+    def test_timings(self):
+        self.populate_file('main.yaml', '''---
+                                include: include.yaml
+                                steps:
+                                  - wait: {seconds: 0.2}
+                                finally:
+                                  - echo: {from: 'cleanup'}
+                                ''')
+        self.populate_file('include.yaml', '''---
+                                steps:
+                                  - echo: {from: 'include'}
+                                ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None, output_format='json')
+        self.assertTrue(runner.run_tests())
+        reports = [f for f in listdir(join(self.test_dir, 'reports'))
+                   if isfile(join(self.test_dir, 'reports', f)) and f.startswith('report')]
+        with open(join(self.test_dir, 'reports', reports[0]), 'r') as fp:
+            include, test, cleanup = json.load(fp)
+            self.assertEqual('include', include['type'])
+            self.assertEqual('test', test['type'])
+            self.assertTrue(cleanup['type'].endswith('_cleanup'))
+            for report in (include, test, cleanup):
+                self.assertIsInstance(report['wall_ns'], int)
+                self.assertIsInstance(report['cpu_ns'], int)
+            wait_end = [o for o in test['output'] if 'success' in o][0]
+            self.assertGreaterEqual(wait_end['wall_ns'], 200000000)  # wall clock time, not CPU one
+            self.assertLess(wait_end['cpu_ns'], wait_end['wall_ns'])
+            self.assertGreaterEqual(test['wall_ns'], wait_end['wall_ns'])
+
+    def test_variables_delta(self):
+        self.populate_file('main.yaml', '''---
+                                steps:
+                                  - echo: {from: 'big', register: {big: '{{ range(100) | list }}'}}
+                                  - echo: {from: 'foo', register: {copy: '{{ OUTPUT }}'}}
+                                  - echo: {from: 'bar', register: {other: '{{ OUTPUT }}'}}
+                                ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None, output_format='json',
+                        variables_delta=True)
+        self.assertTrue(runner.run_tests())
+        reports = [f for f in listdir(join(self.test_dir, 'reports'))
+                   if isfile(join(self.test_dir, 'reports', f)) and f.startswith('report')]
+        with open(join(self.test_dir, 'reports', reports[0]), 'r') as fp:
+            [report] = json.load(fp)
+        self.assertTrue(report['variables_delta'])
+        steps = [o for o in report['output'] if 'step' in o]
+        self.assertTrue('TEST_NAME' in steps[0]['variables'])
+        self.assertEqual([['big'], [], ['copy'], [], ['other']], [list(s['variables']) for s in steps[1:]])
+        expand_variables(report['output'])
+        self.assertEqual(100, len(steps[-1]['variables']['big']))
+        self.assertEqual('foo', steps[-1]['variables']['copy'])
+        self.assertEqual('bar', steps[-1]['variables']['other'])
+
+    def test_expand_removed_variables(self):
+        output = [{'variables': {'a': 1, 'b': 2}},
+                  {'data': 'log'},
+                  {'variables': {'c': 3}, 'removed_variables': ['a']},
+                  {'variables': {}}]
+        expand_variables(output)
+        self.assertEqual({'a': 1, 'b': 2}, output[0]['variables'])
+        self.assertEqual({'b': 2, 'c': 3}, output[2]['variables'])
+        self.assertEqual({'b': 2, 'c': 3}, output[3]['variables'])
+        self.assertFalse('removed_variables' in output[2])
+
+    def test_jsonl_report(self):
+        self.populate_file('main.yaml', '''---
+                                include: include.yaml
+                                steps:
+                                  - echo: {from: 'val', register: {user: '{{ OUTPUT }}'}}
+                                  - check: '{{ user == "other" }}'
+                                ''')
+        self.populate_file('include.yaml', '''---
+                                steps:
+                                  - echo: {from: 'include'}
+                                ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None, output_format='jsonl',
+                        variables_delta=True)
+        self.assertFalse(runner.run_tests())
+        [report] = [f for f in listdir(join(self.test_dir, 'reports')) if f.endswith('.jsonl')]
+        with open(join(self.test_dir, 'reports', report), 'r') as fp:
+            events = [json.loads(line)['event'] for line in fp]
+        self.assertTrue('log' in events)
+        self.assertEqual(['test_start', 'step_start', 'step_end', 'test_end',
+                          'test_start', 'step_start', 'step_end', 'step_start', 'step_end', 'test_end'],
+                         [e for e in events if e != 'log'])
+        include, test = read_report(join(self.test_dir, 'reports', report))
+        self.assertEqual('include', include['type'])
+        self.assertEqual('OK', include['status'])
+        self.assertEqual('test', test['type'])
+        self.assertNotEqual('OK', test['status'])
+        steps = [o for o in test['output'] if 'success' in o]
+        self.assertEqual([True, False], [s['success'] for s in steps])
+        self.assertTrue(test['variables_delta'])
+        self.assertEqual({'user': 'val'}, steps[0]['variables'])
+        self.assertEqual(2, LogStorage.finished_steps(test))
+
+    def test_jsonl_report_parallel(self):
+        self.populate_file('one.yaml', '''---
+                                steps:
+                                  - echo: {from: 'one'}
+                                ''')
+        self.populate_file('two.yaml', '''---
+                                steps:
+                                  - echo: {from: 'two'}
+                                ''')
+        runner = Runner(self.test_dir, self.test_dir, None, output_format='jsonl', jobs=2)
+        self.assertTrue(runner.run_tests())
+        [report] = [f for f in listdir(join(self.test_dir, 'reports')) if f.endswith('.jsonl')]
+        tests = [t for t in read_report(join(self.test_dir, 'reports', report)) if t.get('type') == 'test']
+        self.assertEqual(['one.yaml', 'two.yaml'], sorted([basename(t['file']) for t in tests]))
+        self.assertTrue(all([len([o for o in t['output'] if 'success' in o]) == 1 for t in tests]))
+
+    def test_default_storage(self):
+        self.populate_file('main.yaml', '''---
+                                include: include.yaml
+                                steps:
+                                  - echo: {from: 'one'}
+                                  - echo: {from: 'two', name: 'second'}
+                                  - check: {equals: {the: 1, is: 2}, name: 'compare'}
+                                ''')
+        self.populate_file('include.yaml', '''---
+                                steps:
+                                  - echo: {from: 'include'}
+                                ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None, last_steps=2)
+        self.assertFalse(runner.run_tests())
+        include, test = logger.log_storage.data
+        self.assertFalse('output' in test)
+        self.assertEqual(1, LogStorage.finished_steps(include))
+        self.assertEqual(3, LogStorage.finished_steps(test))
+        self.assertEqual([('second', True), ('compare', False)],
+                         [(step['step'], step['success']) for step in test['last_steps']])
 
     # py36 has dict insert ordering, while older implementations have some other.
     @staticmethod
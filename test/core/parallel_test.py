@@ -0,0 +1,125 @@
+import json
+from os import listdir
+from os.path import join, isfile, basename
+from unittest.mock import patch
+
+from catcher.core.runner import Runner, _run_in_worker
+from catcher.utils import logger
+from test.abs_test_class import TestClass
+from test.test_utils import check_file
+
+
+class ParallelTest(TestClass):
+    def __init__(self, method_name):
+        super().__init__('parallel_test', method_name)
+
+    def test_run_in_parallel(self):
+        self.populate_file('one.yaml', '''---
+        steps:
+            - echo: {from: 'one', to: one.output}
+        ''')
+        self.populate_file('two.yaml', '''---
+        steps:
+            - echo: {from: 'two', to: two.output}
+        ''')
+        self.populate_file('three.yaml', '''---
+        steps:
+            - echo: {from: 'three', to: three.output}
+        ''')
+        runner = Runner(self.test_dir, self.test_dir, None, jobs=2)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'one.output'), 'one'))
+        self.assertTrue(check_file(join(self.test_dir, 'two.output'), 'two'))
+        self.assertTrue(check_file(join(self.test_dir, 'three.output'), 'three'))
+
+    def test_run_in_parallel_failure(self):
+        self.populate_file('one.yaml', '''---
+        steps:
+            - echo: {from: 'one', to: one.output}
+        ''')
+        self.populate_file('two.yaml', '''---
+        steps:
+            - check: {equals: {the: 1, is: 2}}
+        ''')
+        runner = Runner(self.test_dir, self.test_dir, None, jobs=2)
+        self.assertFalse(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'one.output'), 'one'))
+
+    def test_parse_failure_in_parallel(self):
+        self.populate_file('one.yaml', '''---
+        steps:
+            - echo: {from: 'one', to: one.output}
+        ''')
+        self.populate_file('two.yaml', '''---
+        steps:
+            - no_such_step: {foo: bar}
+        ''')
+        runner = Runner(self.test_dir, self.test_dir, None, jobs=2)
+        self.assertFalse(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'one.output'), 'one'))
+
+    def test_includes_and_finally_in_parallel(self):
+        self.populate_file('include.yaml', '''---
+        steps:
+            - echo: {from: 'included', register: {foo: '{{ OUTPUT }}'}}
+        ''')
+        self.populate_file('main.yaml', '''---
+        include: include.yaml
+        steps:
+            - echo: {from: '{{ foo }}', to: main.output}
+        finally:
+            - echo: {from: 'cleaned', to: cleanup.output}
+        ''')
+        self.populate_file('other.yaml', '''---
+        steps:
+            - echo: {from: 'other', to: other.output}
+        ''')
+        runner = Runner(self.test_dir, self.test_dir, None, jobs=2)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), 'included'))
+        self.assertTrue(check_file(join(self.test_dir, 'cleanup.output'), 'cleaned'))
+        self.assertTrue(check_file(join(self.test_dir, 'other.output'), 'other'))
+
+    # failure of the worker (f.e. result can't be sent back) fails only it's test
+    def test_worker_failure(self):
+        self.populate_file('one.yaml', '''---
+        steps:
+            - echo: {from: 'one', to: one.output}
+        ''')
+        self.populate_file('two.yaml', '''---
+        steps:
+            - echo: {from: 'two', to: two.output}
+        ''')
+        runner = Runner(self.test_dir, self.test_dir, None, jobs=2)
+        with patch('catcher.core.runner._run_in_worker', _unpicklable_result):
+            self.assertFalse(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'one.output'), 'one'))
+        tests = {basename(t['file']): t['status'] for t in logger.log_storage.data}
+        self.assertEqual({'one.yaml': 'OK', 'two.yaml': 'FAIL'}, tests)
+
+    def test_report_merged(self):
+        self.populate_file('one.yaml', '''---
+        steps:
+            - echo: {from: 'one'}
+        ''')
+        self.populate_file('two.yaml', '''---
+        steps:
+            - echo: {from: 'two'}
+        ''')
+        runner = Runner(self.test_dir, self.test_dir, None, output_format='json', jobs=2)
+        self.assertTrue(runner.run_tests())
+        reports = [f for f in listdir(join(self.test_dir, 'reports'))
+                   if isfile(join(self.test_dir, 'reports', f)) and f.startswith('report')]
+        self.assertEqual(1, len(reports))
+        with open(join(self.test_dir, 'reports', reports[0]), 'r') as fp:
+            tests = [t for t in json.load(fp) if t.get('type') == 'test']
+            self.assertEqual({join(self.test_dir, 'one.yaml'), join(self.test_dir, 'two.yaml')},
+                             {t['file'] for t in tests})
+            self.assertTrue(all(t['status'] == 'OK' for t in tests))
+
+
+
+def _unpicklable_result(test_file: str, output: str) -> tuple:
+    if test_file.endswith('two.yaml'):
+        return False, [lambda: None], ''  # function can't be sent back from the worker
+    return _run_in_worker(test_file, output)
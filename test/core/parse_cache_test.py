@@ -0,0 +1,99 @@
+import datetime
+import json
+import os
+import pickle
+from os.path import join
+
+import catcher
+from catcher.core.parser import Parser
+from test.abs_test_class import TestClass
+
+
+class ParseCacheTest(TestClass):
+    def __init__(self, method_name):
+        super().__init__('parse_cache_test', method_name)
+
+    @property
+    def cache_dir(self):
+        return join(self.test_dir, '.catcher_cache')
+
+    # include read many times is parsed once
+    def test_memo(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - echo: {from: 'hello'}
+        ''')
+        parser = Parser(self.test_dir, None)
+        first = parser.read_test(join(self.test_dir, 'main.yaml'))
+        second = parser.read_test(join(self.test_dir, 'main.yaml'))
+        self.assertEqual(first.steps, second.steps)
+        self.assertFalse(first.steps is second.steps)
+        self.assertEqual(1, parser.cache.misses)
+        self.assertEqual(1, parser.cache.hits)
+
+    # parsed test is reused between runs and is invalidated on change
+    def test_persistent(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - echo: {from: 'hello'}
+        ''')
+        parser = Parser(self.test_dir, None, cache_dir=self.cache_dir)
+        parser.read_test(join(self.test_dir, 'main.yaml'))
+        self.assertEqual(1, parser.cache.misses)
+
+        parser = Parser(self.test_dir, None, cache_dir=self.cache_dir)
+        test = parser.read_test(join(self.test_dir, 'main.yaml'))
+        self.assertEqual(1, parser.cache.hits)
+        self.assertEqual([{'echo': {'from': 'hello'}}], test.steps)
+
+        os.utime(join(self.test_dir, 'main.yaml'), ns=(0, 0))  # touched, but not changed
+        parser = Parser(self.test_dir, None, cache_dir=self.cache_dir)
+        parser.read_test(join(self.test_dir, 'main.yaml'))
+        self.assertEqual(1, parser.cache.hits)
+
+        self.populate_file('main.yaml', '''---
+        steps:
+            - echo: {from: 'changed'}
+        ''')
+        parser = Parser(self.test_dir, None, cache_dir=self.cache_dir)
+        test = parser.read_test(join(self.test_dir, 'main.yaml'))
+        self.assertEqual(1, parser.cache.misses)
+        self.assertEqual([{'echo': {'from': 'changed'}}], test.steps)
+
+    # broken or planted entries are not loaded, entries are json
+    def test_broken_entry(self):
+        self.populate_file('main.yaml', '''---
+        variables:
+            date: 2020-01-01
+        steps:
+            - echo: {from: 'hello'}
+        ''')
+        parser = Parser(self.test_dir, None, cache_dir=self.cache_dir)
+        parser.read_test(join(self.test_dir, 'main.yaml'))
+        [entry] = os.listdir(self.cache_dir)
+        with open(join(self.cache_dir, entry)) as f:
+            self.assertEqual('hello', json.load(f)['body']['steps'][0]['echo']['from'])
+
+        parser = Parser(self.test_dir, None, cache_dir=self.cache_dir)
+        test = parser.read_test(join(self.test_dir, 'main.yaml'))
+        self.assertEqual(1, parser.cache.hits)
+        self.assertEqual(datetime.date(2020, 1, 1), test.variables['date'])
+
+        with open(join(self.cache_dir, entry), 'wb') as f:
+            f.write(pickle.dumps({'version': catcher.APPVSN}))
+        parser = Parser(self.test_dir, None, cache_dir=self.cache_dir)
+        parser.read_test(join(self.test_dir, 'main.yaml'))
+        self.assertEqual(1, parser.cache.misses)
+
+    # files, which can't be stored as json as is, are not stored
+    def test_not_json(self):
+        self.populate_file('main.yaml', '''---
+        variables:
+            codes: {200: 'ok'}
+        steps:
+            - echo: {from: 'hello'}
+        ''')
+        parser = Parser(self.test_dir, None, cache_dir=self.cache_dir)
+        test = parser.read_test(join(self.test_dir, 'main.yaml'))
+        self.assertEqual({200: 'ok'}, test.variables['codes'])
+        self.assertFalse(os.path.exists(self.cache_dir))
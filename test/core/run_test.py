@@ -178,3 +178,14 @@ class RunTest(TestClass):
         runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None, system_environment=dict(os.environ))
         self.assertFalse(runner.run_tests())
 
+
+    # invalid step definition fails the test before any step is run
+    def test_invalid_step_fails_before_run(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - echo: {from: 'test', to: main.output}
+            - no_such_step: {foo: bar}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertFalse(runner.run_tests())
+        self.assertFalse(os.path.exists(join(self.test_dir, 'main.output')))
@@ -0,0 +1,78 @@
+from catcher.core.scope import Scope, MAX_DEPTH, changes, removed
+from test.abs_test_class import TestClass
+
+
+class ScopeTest(TestClass):
+    def __init__(self, method_name):
+        super().__init__('scope_test', method_name)
+
+    # changes in child scope are not visible in parent
+    def test_child_isolated(self):
+        parent = Scope({'foo': 1, 'bar': 2})
+        child = parent.child()
+        child['foo'] = 3
+        child['baz'] = 4
+        del child['bar']
+        self.assertEqual({'foo': 3, 'baz': 4}, child.flatten())
+        self.assertEqual({'foo': 1, 'bar': 2}, parent.flatten())
+        self.assertFalse('bar' in child)
+        self.assertEqual({'foo': 3, 'baz': 4}, child.changes)
+        self.assertEqual(['bar'], child.deleted)
+
+    # snapshot is not affected by later changes
+    def test_snapshot(self):
+        scope = Scope({'foo': 1})
+        scope['bar'] = 2
+        snapshot = scope.snapshot()
+        scope['bar'] = 3
+        del scope['foo']
+        self.assertEqual({'foo': 1, 'bar': 2}, snapshot.flatten())
+        self.assertEqual({'bar': 3}, scope.flatten())
+
+    # long chains of snapshots are flattened
+    def test_depth_limited(self):
+        scope = Scope({'foo': 0})
+        snapshots = []
+        for i in range(MAX_DEPTH * 3):
+            scope['foo'] = i
+            snapshots.append(scope.snapshot())
+        self.assertTrue(scope.depth <= MAX_DEPTH)
+        self.assertEqual(list(range(MAX_DEPTH * 3)), [s['foo'] for s in snapshots])
+
+    # changes of the child scope are found without walking all the parent's variables
+    def test_changes(self):
+        class Environment(dict):
+            def __iter__(self):
+                raise AssertionError('should not be iterated')
+
+        base = Scope(Environment(foo=1, bar=2))
+        child = Scope(base)
+        child['foo'] = 3
+        child['baz'] = 4
+        child['bar'] = base['bar']  # same value, not changed
+        child.snapshot()
+        child['qux'] = 5
+        del child['baz']
+        self.assertEqual({'foo': 3, 'qux': 5}, changes(child, base))
+        self.assertEqual({'foo': 3, 'qux': 5}, changes({'foo': 3, 'bar': 2, 'qux': 5}, {'foo': 1, 'bar': 2}))
+
+    def test_snapshots_chain(self):
+        class Environment(dict):
+            def __iter__(self):
+                raise AssertionError('should not be iterated')
+
+        scope = Scope(Environment(foo=-1, bar=1))
+        previous = scope.snapshot()
+        for i in range(MAX_DEPTH * 3):  # every snapshot is compared to the previous one by it's layers only
+            scope['foo'] = i
+            scope['iter_' + str(i)] = i
+            if i == 1:
+                del scope['bar']
+            current = scope.snapshot()
+            self.assertEqual({'foo': i, 'iter_' + str(i): i}, changes(current, previous))
+            self.assertEqual(['bar'] if i == 1 else [], removed(current, previous))
+            self.assertTrue(scope.depth <= MAX_DEPTH)
+            previous = current
+        self.assertEqual(MAX_DEPTH * 3 - 1, previous['foo'])
+        self.assertEqual(0, previous['iter_0'])
+        self.assertFalse('bar' in previous)
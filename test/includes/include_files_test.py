@@ -1,9 +1,11 @@
 import os
 from os.path import join
 
+from catcher.core.parser import Parser
 from catcher.core.runner import Runner
+from catcher.utils.file_utils import ensure_dir
 from test.abs_test_class import TestClass
-from test.test_utils import check_file
+from test.test_utils import check_file, read_file
 
 
 class IncludeFilesTest(TestClass):
@@ -185,3 +187,141 @@ class IncludeFilesTest(TestClass):
         runner.run_tests()
         self.assertFalse(os.path.exists(join(self.test_dir, 'foo.output')))
         self.assertTrue(check_file(join(self.test_dir, 'bar.output'), '12'))
+
+    # circular include error reports the whole cycle
+    def test_circular_includes_path(self):
+        self.populate_file('main.yaml', '''---
+        include: a.yaml
+        ''')
+        self.populate_file('a.yaml', '''---
+        include: b.yaml
+        ''')
+        self.populate_file('b.yaml', '''---
+        include: a.yaml
+        ''')
+        parser = Parser(self.test_dir, None)
+        [result] = list(parser.read_tests(join(self.test_dir, 'main.yaml')))
+        self.assertIsNotNone(result.parse_error)
+        self.assertIn('a.yaml -> ' + join(self.test_dir, 'b.yaml') + ' -> ' + join(self.test_dir, 'a.yaml'),
+                      str(result.parse_error))
+
+    # thousands of includes, many of them shared, are resolved without searching for cycles in the whole graph
+    def test_many_includes(self):
+        depth, width = 30, 100
+        for level in range(depth):
+            self.populate_file('chain_{}.yaml'.format(level), '---\ninclude: chain_{}.yaml\n'.format(level + 1))
+        self.populate_file('chain_{}.yaml'.format(depth), '---\nsteps:\n    - echo: {from: done}\n')
+        self.populate_file('main.yaml', '---\ninclude:\n' +
+                           ''.join('    - file: chain_0.yaml\n      as: c{}\n'.format(i) for i in range(width)))
+        parser = Parser(self.test_dir, None)
+        [result] = list(parser.read_tests(join(self.test_dir, 'main.yaml')))
+        self.assertIsNone(result.parse_error)
+        self.assertEqual(width * depth, len(result.run_on_include))
+
+    # run scoped include is run once for all tests with the same include variables
+    def test_run_scoped_include(self):
+        ensure_dir(join(self.test_dir, 'tests'))
+        self.populate_file('tests/first.yaml', '''---
+        include:
+            file: register.yaml
+            scope: run
+            variables: {user: alice}
+        steps:
+            - echo: {from: '{{ token }}', to: first.output}
+        ''')
+        self.populate_file('tests/second.yaml', '''---
+        include:
+            file: register.yaml
+            scope: run
+            variables: {user: alice}
+        steps:
+            - echo: {from: '{{ token }}', to: second.output}
+        ''')
+        self.populate_file('tests/third.yaml', '''---
+        include:
+            file: register.yaml
+            scope: run
+            variables: {user: bob}
+        steps:
+            - echo: {from: '{{ token }}', to: third.output}
+        ''')
+        self.populate_file('register.yaml', '''---
+        steps:
+            - echo: {from: '{{ user }}_{{ RANDOM_STR }}', register: {token: '{{ OUTPUT }}'}}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'tests'), None)
+        self.assertTrue(runner.run_tests())
+        first = read_file(join(self.test_dir, 'first.output'))
+        self.assertTrue(first.startswith('alice_'))
+        self.assertEqual(first, read_file(join(self.test_dir, 'second.output')))
+        self.assertTrue(read_file(join(self.test_dir, 'third.output')).startswith('bob_'))
+
+    # run scoped include sees only it's variables, not the ones registered by the test's previous includes
+    def test_run_scoped_include_inputs(self):
+        ensure_dir(join(self.test_dir, 'tests'))
+        for user in ['alice', 'bob']:
+            self.populate_file('tests/{}.yaml'.format(user), '''---
+            include:
+                - file: login.yaml
+                  variables: {user: %s}
+                - file: token.yaml
+                  scope: run
+                  variables: {login: '{{ login }}'}
+                - file: greeting.yaml
+                  scope: run
+            steps:
+                - echo: {from: '{{ token }} {{ greeting }}', to: %s.output}
+            ''' % (user, user))
+        self.populate_file('login.yaml', '''---
+        steps:
+            - echo: {from: '{{ user }}', register: {login: '{{ OUTPUT }}'}}
+        ''')
+        self.populate_file('token.yaml', '''---
+        steps:
+            - echo: {from: '{{ login }}_{{ RANDOM_STR }}', register: {token: '{{ OUTPUT }}'}}
+        ''')
+        self.populate_file('greeting.yaml', '''---
+        steps:
+            - echo: {from: 'hello {{ login | default("nobody") }}', register: {greeting: '{{ OUTPUT }}'}}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'tests'), None)
+        self.assertTrue(runner.run_tests())
+        alice = read_file(join(self.test_dir, 'alice.output'))
+        bob = read_file(join(self.test_dir, 'bob.output'))
+        self.assertTrue(alice.startswith('alice_') and alice.endswith(' hello nobody'))
+        self.assertTrue(bob.startswith('bob_') and bob.endswith(' hello nobody'))
+
+    # failed run scoped include is not reused, it is run again
+    def test_run_scoped_include_failed(self):
+        ensure_dir(join(self.test_dir, 'tests'))
+        for name in ['first', 'second']:
+            self.populate_file('tests/{}.yaml'.format(name), '''---
+            include:
+                file: register.yaml
+                scope: run
+            steps:
+                - echo: {from: 'hello', to: %s.output}
+            ''' % name)
+        self.populate_file('register.yaml', '''---
+        steps:
+            - sh: {command: 'touch {{ CURRENT_DIR }}/run_{{ RANDOM_STR }}.output'}
+            - check: {equals: {the: 1, is: 2}}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'tests'), None)
+        runner.run_tests()
+        self.assertEqual(2, len([f for f in os.listdir(self.test_dir) if f.startswith('run_')]))
+
+    # unknown include scope is a parse error
+    def test_unknown_include_scope(self):
+        self.populate_file('main.yaml', '''---
+        include:
+            file: simple_file.yaml
+            scope: session
+        ''')
+        self.populate_file('simple_file.yaml', '''---
+        steps:
+            - echo: {from: 'hello', to: foo.output}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertFalse(runner.run_tests())
+        self.assertFalse(os.path.exists(join(self.test_dir, 'foo.output')))
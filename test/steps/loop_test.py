@@ -1,3 +1,5 @@
+import os
+import time
 from os.path import join
 
 from catcher.core.runner import Runner
@@ -77,6 +79,33 @@ class LoopTest(TestClass):
         runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
         self.assertTrue(runner.run_tests())
 
+    def test_max_cycle_reused(self):
+        """
+        compiled loop step is reused by every run of the include and should start with a full max_cycle
+        """
+        self.populate_file('counter.yaml', '''---
+        steps:
+            - loop:
+                while:
+                    if: '{{ counter < 10000 }}'
+                    do:
+                        echo: {from: '{{ counter + 1}}', register: {counter: '{{ OUTPUT }}'}}
+                    max_cycle: 2
+        ''')
+        self.populate_file('main.yaml', '''---
+        include:
+            file: counter.yaml
+            as: count
+        variables:
+            counter: 0
+        steps:
+            - run: count
+            - run: count
+            - check: '{{ counter == 6 }}'
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+
     def test_for(self):
         self.populate_file('main.yaml', '''---
         variables:
@@ -207,3 +236,144 @@ class LoopTest(TestClass):
         self.assertFalse(check_file(join(self.test_dir, 'a_after.output'), '1'))
         self.assertFalse(check_file(join(self.test_dir, 'b_after.output'), '1'))
         self.assertFalse(check_file(join(self.test_dir, 'c_after.output'), '1'))
+
+    # parallel iterations register variables to lists in order of elements
+    def test_for_parallel(self):
+        self.populate_file('main.yaml', '''---
+        variables:
+            counter: 0
+        steps:
+            - loop:
+                foreach:
+                    in: [3, 1, 2, 4]
+                    parallel: 4
+                    do:
+                        - sh: {command: 'sleep 0.{{ ITEM }}'}
+                        - echo: {from: '{{ ITEM * 2 }}', register: {double: '{{ OUTPUT }}'}}
+                        - echo: {from: '{{ counter + 1 }}', register: {counter: '{{ OUTPUT }}'}}
+                        - echo: {from: 'odd', register: {odd: '{{ OUTPUT }}'}, skip_if: '{{ ITEM % 2 == 0 }}'}
+            - echo: {from: '{{ double }} {{ counter }} {{ odd }}', to: main.output}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        start = time.monotonic()
+        self.assertTrue(runner.run_tests())
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'),
+                                   "[6, 2, 4, 8] [1, 1, 1, 1] ['odd', 'odd', None, None]"))
+
+    # all parallel iterations run their sync steps at the same time
+    def test_for_parallel_sync_steps(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - loop:
+                foreach:
+                    in: %s
+                    parallel: 100
+                    do:
+                        - sh: {command: 'sleep 0.3'}
+                        - echo: {from: '{{ ITEM }}', register: {item: '{{ OUTPUT }}'}}
+            - echo: {from: '{{ item | length }}', to: main.output}
+        ''' % list(range(100)))
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        start = time.monotonic()
+        self.assertTrue(runner.run_tests())
+        self.assertLess(time.monotonic() - start, 0.9)  # default executor has not more than 32 threads
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), '100'))
+
+    # first failed parallel iteration fails the loop, not started iterations are not run
+    def test_for_parallel_fail(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - loop:
+                foreach:
+                    in: [1, 2, 3]
+                    parallel: 1
+                    do:
+                        - check: '{{ ITEM != 2 }}'
+                        - echo: {from: '{{ ITEM }}', to: '{{ ITEM }}.output'}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertFalse(runner.run_tests())
+        self.assertTrue(os.path.exists(join(self.test_dir, '1.output')))
+        self.assertFalse(os.path.exists(join(self.test_dir, '2.output')))
+        self.assertFalse(os.path.exists(join(self.test_dir, '3.output')))
+
+    def test_for_lines(self):
+        self.populate_file('main.yaml', '''---
+        variables:
+            names: ''
+        steps:
+            - loop:
+                foreach:
+                    in_lines: 'names.txt'
+                    do:
+                        echo: {from: '{{ names }}{{ ITEM }};', register: {names: '{{ OUTPUT }}'}}
+            - echo: {from: '{{ names }}', to: main.output}
+        ''')
+        self.populate_resource('names.txt', 'alice\nbob\n\ncarol')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), 'alice;bob;;carol;'))
+
+    def test_for_csv(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - loop:
+                foreach:
+                    in_csv: 'users.csv'
+                    delimiter: ';'
+                    do:
+                        echo: {from: '{{ ITEM.email }}', to: '{{ ITEM.name }}.output'}
+        ''')
+        self.populate_resource('users.csv', 'name;email\nalice;alice@test.com\nbob;bob@test.com\n')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'alice.output'), 'alice@test.com'))
+        self.assertTrue(check_file(join(self.test_dir, 'bob.output'), 'bob@test.com'))
+
+    def test_for_jsonl_parallel(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - loop:
+                foreach:
+                    in_jsonl: 'events/events.jsonl'
+                    parallel: 2
+                    do:
+                        echo: {from: '{{ ITEM.id * 10 }}', register: {ids: '{{ OUTPUT }}'}}
+            - echo: {from: '{{ ids }}', to: main.output}
+        ''')
+        self.populate_resource('events/events.jsonl', '{"id": 1}\n{"id": 2}\n\n{"id": 3}\n')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), '[10, 20, 30]'))
+
+    def test_for_variable(self):
+        self.populate_file('main.yaml', '''---
+        variables:
+            users:
+                - {name: alice}
+                - {name: bob}
+        steps:
+            - loop:
+                foreach:
+                    in_variable: 'users'
+                    do:
+                        echo: {from: '{{ ITEM.name }}', to: '{{ ITEM.name }}.output'}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'alice.output'), 'alice'))
+        self.assertTrue(check_file(join(self.test_dir, 'bob.output'), 'bob'))
+
+    def test_for_several_sources(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - loop:
+                foreach:
+                    in: [1, 2]
+                    in_lines: 'names.txt'
+                    do:
+                        echo: {from: '{{ ITEM }}'}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertFalse(runner.run_tests())
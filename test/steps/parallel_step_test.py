@@ -0,0 +1,93 @@
+import os
+import time
+from os.path import join
+
+from catcher.core.runner import Runner
+from test.abs_test_class import TestClass
+from test.test_utils import check_file
+
+
+class ParallelStepTest(TestClass):
+    def __init__(self, method_name):
+        super().__init__('parallel_step_test', method_name)
+
+    # actions are run at the same time
+    def test_run_concurrently(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - parallel:
+                do:
+                    - sh: {command: 'sleep 0.5'}
+                    - sh: {command: 'sleep 0.5'}
+                    - sh: {command: 'sleep 0.5'}
+                    - sh: {command: 'sleep 0.5'}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        start = time.monotonic()
+        self.assertTrue(runner.run_tests())
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    # not more than limit actions are run at the same time
+    def test_limit(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - parallel:
+                limit: 1
+                do:
+                    - sh: {command: 'sleep 0.2'}
+                    - sh: {command: 'sleep 0.2'}
+                    - sh: {command: 'sleep 0.2'}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        start = time.monotonic()
+        self.assertTrue(runner.run_tests())
+        self.assertGreaterEqual(time.monotonic() - start, 0.6)
+
+    # registered variables are merged in order of actions, actions don't see each other's variables
+    def test_register_merge(self):
+        self.populate_file('main.yaml', '''---
+        variables:
+            foo: 1
+        steps:
+            - parallel:
+                do:
+                    - wait:
+                        seconds: 0.2
+                        register: {first: '{{ foo }}', same: 'first'}
+                    - echo: {from: '{{ first is defined }}', register: {second: '{{ OUTPUT }}', same: 'second'}}
+                    - echo:
+                        actions:
+                            - {from: '{{ foo + 1 }}', register: {foo: '{{ OUTPUT }}'}}
+                            - {from: '{{ foo + 1 }}', register: {third: '{{ OUTPUT }}'}}
+            - echo: {from: '{{ first }} {{ second }} {{ third }} {{ foo }} {{ same }}', to: main.output}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), '1 False 3 2 second'))
+
+    # one failed action fails the step and cancels not started ones
+    def test_fail_cancels(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - parallel:
+                limit: 1
+                do:
+                    - sh: {command: 'false'}
+                    - echo: {from: 'not run', to: main.output}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertFalse(runner.run_tests())
+        self.assertFalse(os.path.exists(join(self.test_dir, 'main.output')))
+
+    # failed action with ignore_errors doesn't fail others
+    def test_ignore_errors(self):
+        self.populate_file('main.yaml', '''---
+        steps:
+            - parallel:
+                do:
+                    - sh: {command: 'false', ignore_errors: true}
+                    - echo: {from: 'run', to: main.output}
+        ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), 'run'))
@@ -1,7 +1,12 @@
+import socket
+import threading
+import time
 from os.path import join
 
 from catcher.core.runner import Runner
+from catcher.utils.file_utils import read_file
 from test.abs_test_class import TestClass
+from test.test_utils import check_file
 
 
 class WaitTest(TestClass):
@@ -70,3 +75,189 @@ class WaitTest(TestClass):
                                     ''')
         runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
         self.assertFalse(runner.run_tests())
+
+    def test_wait_interval(self):
+        """
+        wait should sleep between attempts and return their number
+        """
+        self.populate_file('main.yaml', '''---
+                    steps:
+                        - parallel:
+                            do:
+                                - loop:
+                                    foreach:
+                                        in: [1]
+                                        do:
+                                            - wait: {seconds: 0.5}
+                                            - echo: {from: 'ready', to: '{{ RESOURCES_DIR }}/ready.txt'}
+                                - wait:
+                                    seconds: 5
+                                    interval: 0.1
+                                    register: {attempts: '{{ OUTPUT.attempts }}', elapsed: '{{ OUTPUT.elapsed }}'}
+                                    for:
+                                        echo: {from_file: 'ready.txt'}
+                        - echo: {from: '{{ attempts }} {{ elapsed }}', to: main.output}
+                    ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        attempts, elapsed = read_file(join(self.test_dir, 'main.output')).split(' ')
+        self.assertTrue(2 <= int(attempts) <= 10)
+        self.assertTrue(0.5 <= float(elapsed) < 2)
+
+    def test_wait_backoff(self):
+        """
+        interval grows with backoff till max_interval
+        """
+        self.populate_file('main.yaml', '''---
+                    steps:
+                        - wait:
+                            seconds: 1.6
+                            interval: 0.1
+                            backoff: 2
+                            max_interval: 0.4
+                            jitter: 0.5
+                            for:
+                                check: {equals: {the: 1, is: 2}}
+                    ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        start = time.monotonic()
+        self.assertFalse(runner.run_tests())
+        self.assertTrue(1.6 <= time.monotonic() - start < 3)
+
+    def test_wait_deadline_cancels(self):
+        """
+        hanging attempt is cancelled when time ends
+        """
+        self.populate_file('main.yaml', '''---
+                    steps:
+                        - wait:
+                            seconds: 0.3
+                            for:
+                                wait: {seconds: 10}
+                    ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        start = time.monotonic()
+        self.assertFalse(runner.run_tests())
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_wait_port(self):
+        server = socket.socket()
+        server.bind(('localhost', 0))
+        port = server.getsockname()[1]
+        self.populate_file('main.yaml', '''---
+                    steps:
+                        - wait:
+                            seconds: 5
+                            port: 'localhost:{}'
+                            register: {{elapsed: '{{{{ OUTPUT.elapsed }}}}'}}
+                        - echo: {{from: '{{{{ elapsed }}}}', to: main.output}}
+                    '''.format(port))
+        timer = threading.Timer(0.3, server.listen)
+        timer.start()
+        try:
+            runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+            self.assertTrue(runner.run_tests())
+        finally:
+            timer.cancel()
+            server.close()
+        self.assertTrue(0 < float(read_file(join(self.test_dir, 'main.output'))) < 1)
+
+    def test_wait_port_fail(self):
+        server = socket.socket()
+        server.bind(('localhost', 0))
+        port = server.getsockname()[1]
+        self.populate_file('main.yaml', '''---
+                    steps:
+                        - wait: {{seconds: 0.3, port: {}}}
+                    '''.format(port))
+        try:
+            runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+            self.assertFalse(runner.run_tests())
+        finally:
+            server.close()
+
+    def test_wait_file(self):
+        self.populate_file('main.yaml', '''---
+                    steps:
+                        - wait:
+                            seconds: 5
+                            file: '{{ CURRENT_DIR }}/ready.txt'
+                        - wait:
+                            seconds: 5
+                            file: {path: '{{ CURRENT_DIR }}/ready.txt', contains: 'done'}
+                    ''')
+        ready = join(self.test_dir, 'ready.txt')
+        threading.Timer(0.2, lambda: open(ready, 'w').close()).start()
+        threading.Timer(0.4, lambda: append_file(ready, 'not yet\nall done')).start()
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        start = time.monotonic()
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(time.monotonic() - start < 1.5)
+
+    # file without contains is waited to exist, even if it is empty
+    def test_wait_file_path_only(self):
+        self.populate_file('ready.txt', '')
+        self.populate_file('main.yaml', '''---
+                    steps:
+                        - wait:
+                            seconds: 1
+                            file: {path: '{{ CURRENT_DIR }}/ready.txt'}
+                    ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        start = time.monotonic()
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(time.monotonic() - start < 0.5)
+
+    def test_wait_log(self):
+        self.populate_file('service.log', 'Starting\n')
+        self.populate_file('main.yaml', '''---
+                    steps:
+                        - wait:
+                            seconds: 5
+                            log: {file: '{{ CURRENT_DIR }}/service.log', regex: 'Started on port (\\d+)'}
+                            register: {port: '{{ OUTPUT.groups[0] }}'}
+                        - echo: {from: '{{ port }}', to: main.output}
+                    ''')
+        log = join(self.test_dir, 'service.log')
+        threading.Timer(0.2, lambda: append_file(log, 'Loading\n')).start()
+        threading.Timer(0.3, lambda: append_file(log, 'Started on port 8080\n')).start()
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), '8080'))
+
+    # line being written is not matched partially, last line without line ending is matched when it is complete
+    def test_wait_log_partial_line(self):
+        self.populate_file('service.log', 'Starting\n')
+        self.populate_file('main.yaml', '''---
+                    steps:
+                        - wait:
+                            seconds: 5
+                            log: {file: '{{ CURRENT_DIR }}/service.log', regex: 'port (\\d+)'}
+                            register: {port: '{{ OUTPUT.groups[0] }}'}
+                        - wait:
+                            seconds: 5
+                            log: {file: '{{ CURRENT_DIR }}/service.log', regex: 'Ready'}
+                        - echo: {from: '{{ port }}', to: main.output}
+                    ''')
+        log = join(self.test_dir, 'service.log')
+        threading.Timer(0.1, lambda: append_file(log, 'Started on port 80')).start()
+        threading.Timer(0.15, lambda: append_file(log, '80\nReady')).start()
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertTrue(runner.run_tests())
+        self.assertTrue(check_file(join(self.test_dir, 'main.output'), '8080'))
+
+    def test_wait_log_fail(self):
+        self.populate_file('service.log', 'Starting\n')
+        self.populate_file('main.yaml', '''---
+                    steps:
+                        - wait:
+                            seconds: 0.3
+                            log: {file: '{{ CURRENT_DIR }}/service.log', regex: 'Started'}
+                    ''')
+        runner = Runner(self.test_dir, join(self.test_dir, 'main.yaml'), None)
+        self.assertFalse(runner.run_tests())
+
+
+def append_file(path: str, text: str):
+    with open(path, 'a') as f:
+        f.write(text)
@@ -68,6 +68,17 @@ class UtilsTest(TestClass):
         expected.reverse()
         self.assertEqual(sorted(expected), sorted(result))
 
+    # find files, matching include patterns and skip excluded files and directories
+    def test_find_all_include_exclude(self):
+        files = ['d', 'd/steps', 'd/d1', 'd/test1.yaml', 'd/test2_draft.yaml', 'd/d1/test3.yaml', 'd/steps/login.yaml']
+        self.__populate_files(files)
+        result = get_files(join(self.test_dir, 'd'), exclude=['steps', '*_draft.yaml'])
+        self.assertEqual(sorted([join(self.test_dir, 'd/test1.yaml'), join(self.test_dir, 'd/d1/test3.yaml')]),
+                         sorted(result))
+        result = get_files(join(self.test_dir, 'd'), include=['test*.yaml'], exclude=['d1/*'])
+        self.assertEqual(sorted([join(self.test_dir, 'd/test1.yaml'), join(self.test_dir, 'd/test2_draft.yaml')]),
+                         sorted(result))
+
     def __populate_files(self, files):
         for file in files:
             if file.endswith('.yaml'):
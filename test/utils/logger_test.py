@@ -0,0 +1,41 @@
+import logging
+
+from catcher.modules.log_storage import LogStorage
+from catcher.utils import logger
+from test.abs_test_class import TestClass
+
+
+class LoggerTest(TestClass):
+    def __init__(self, method_name):
+        super().__init__('logger_test', method_name)
+
+    def setUp(self):
+        super().setUp()
+        self._level = logging.root.level
+        logger.log_storage = LogStorage('json')
+        logger.log_storage.test_start('test.yaml')
+
+    def tearDown(self):
+        logging.root.setLevel(self._level)
+        super().tearDown()
+
+    # message is formed only if level is enabled
+    def test_lazy_message(self):
+        def message():
+            raise AssertionError('should not be called')
+
+        logging.root.setLevel(logging.INFO)
+        logger.debug(message)
+        logger.debug('{} {}', 'not', 'formatted')
+        logger.info(lambda: 'called')
+        logger.info('{} {}', 'formatted', 1)
+        logger.info('not {formatted}')
+        self.assertEqual([('info', 'called'), ('info', 'formatted 1'), ('info', 'not {formatted}')],
+                         [(o['level'], o['data']) for o in logger.log_storage._current_test['output']])
+
+    def test_debug_enabled(self):
+        logging.root.setLevel(logging.DEBUG)
+        logger.debug(lambda: 'called')
+        logger.debug('{} is not equal to {}', [1], {'a': 1})
+        self.assertEqual(['called', "[1] is not equal to {'a': 1}"],
+                         [o['data'] for o in logger.log_storage._current_test['output']])
@@ -1,6 +1,10 @@
 import datetime
+from unittest.mock import patch
 
-from catcher.utils.misc import try_get_object, fill_template
+from catcher.utils.misc import try_get_object, fill_template, template_cache_info, fill_template_recursive, \
+    fill_template_str, compile_term, eval_expression, TEXT, LITERAL, EXPRESSION, fill_template_native, \
+    fill_template_object, _compile_term_cached, clear_import_cache
+from catcher.utils.time_utils import format_ns
 
 from test.abs_test_class import TestClass
 
@@ -72,3 +76,112 @@ class MiscTest(TestClass):
         self.assertEqual(my_tuple, fill_template('{{ OUTPUT }}', {'OUTPUT': my_tuple}))
         my_complex = [(1, {'foo': [1, 2, 3]}, [1, 2, {1: 'a'}])]
         self.assertEqual(my_complex, fill_template('{{ OUTPUT }}', {'OUTPUT': my_complex}))
+
+    # same template source is compiled only once
+    def test_template_cache(self):
+        before = template_cache_info()
+        self.assertEqual(1, fill_template('{{ cached_var }}', {'cached_var': 1}))
+        self.assertEqual(2, fill_template('{{ cached_var }}', {'cached_var': 2}))
+        after = template_cache_info()
+        self.assertEqual(before['misses'] + 1, after['misses'])
+        self.assertEqual(before['hits'] + 1, after['hits'])
+
+    # strings without templates are filled the same way as rendered ones
+    def test_fill_not_templated(self):
+        self.assertEqual(17, fill_template('17', {}))
+        self.assertEqual('http://test.com', fill_template('http://test.com', {}))
+        self.assertEqual('line', fill_template('line\n', {}))
+        self.assertEqual('line', fill_template_str('line\n', {}))
+        self.assertEqual((1, 2), fill_template('(1, 2)', {}))
+        self.assertEqual({'a': 1, 'b': [1, 2, 'c']}, fill_template_recursive({'a': '1', 'b': [1, '2', 'c']}, {}))
+        static = {'a': 'text', 'b': [1, {'c': 'd'}]}
+        self.assertTrue(fill_template_recursive(static, {}) is static)  # nothing to fill - not copied
+        templated = {'a': 'text', 'b': [1, {'c': '{{ d }}'}], 'e': [2, 3]}
+        filled = fill_template_recursive(templated, {'d': 'x'})
+        self.assertEqual({'a': 'text', 'b': [1, {'c': 'x'}], 'e': [2, 3]}, filled)
+        self.assertTrue(filled['e'] is templated['e'])
+        self.assertEqual('{{ d }}', templated['b'][1]['c'])
+
+    # cached literal value is not shared between fills
+    def test_fill_not_templated_copy(self):
+        first = fill_template('[1, 2]', {})
+        first.append(3)
+        self.assertEqual([1, 2], fill_template('[1, 2]', {}))
+
+    # built-ins are computed once per render and can't be overridden
+    def test_builtins(self):
+        first, second = fill_template('{{ RANDOM_STR }} {{ RANDOM_STR }}', {}).split(' ')
+        self.assertEqual(first, second)
+        self.assertNotEqual('mine', fill_template('{{ RANDOM_STR }}', {'RANDOM_STR': 'mine'}))
+        self.assertTrue(isinstance(fill_template('{{ RANDOM_INT }}', {}), int))
+
+    # strings are parsed and compiled only once, expressions are evaluated every time
+    def test_compile_term(self):
+        self.assertEqual((TEXT, None), compile_term('hello world'))
+        self.assertEqual((TEXT, None), compile_term('a = 1'))
+        self.assertEqual((LITERAL, {'a': [1, 2]}), compile_term("{'a': [1, 2]}"))
+        kind, _ = compile_term('datetime.datetime(2020, 1, 1)')
+        self.assertEqual(EXPRESSION, kind)
+        before = _compile_term_cached.cache_info().hits
+        compile_term('datetime.datetime(2020, 1, 1)')
+        self.assertEqual(before + 1, _compile_term_cached.cache_info().hits)
+        self.assertEqual(datetime.datetime(2020, 1, 1), eval_expression('datetime.datetime(2020, 1, 1)'))
+        with self.assertRaises(ValueError):
+            eval_expression('hello world')
+        with self.assertRaises(NameError):
+            eval_expression('not_existing_name')
+
+    # big rendered values are not kept in the cache
+    def test_compile_term_big(self):
+        big = str({'key_{}'.format(i): 'value' for i in range(1000)})
+        size = _compile_term_cached.cache_info().currsize
+        self.assertEqual(1000, len(fill_template('{{ big }}', {'big': big})))
+        self.assertEqual(LITERAL, compile_term(big)[0])
+        self.assertEqual(size, _compile_term_cached.cache_info().currsize)
+
+    # missing modules are imported only when asked
+    def test_eval_import_missing(self):
+        glob = {}
+        with self.assertRaises(NameError):
+            eval_expression('os.path.sep', glob)
+        self.assertEqual('/', eval_expression('os.path.sep', glob, import_missing=True))
+
+    # native rendering returns objects from variables by reference
+    def test_fill_template_native(self):
+        big_list = [{'id': i} for i in range(1000)]
+        self.assertIs(big_list, fill_template_native('{{ big_list }}', {'big_list': big_list}))
+        self.assertEqual([1, 2], fill_template_native('{{ [a, 2] }}', {'a': 1}))
+        self.assertEqual(17, fill_template_native('{{ a }}', {'a': '17'}))
+        self.assertEqual('a b', fill_template_native('{{ a }} {{ b }}', {'a': 'a', 'b': 'b'}))
+        self.assertEqual('2020-01-01 00:00:00', fill_template_native('{{ d }}', {'d': datetime.datetime(2020, 1, 1)}))
+        self.assertEqual('', fill_template_native('{{ not_defined }}', {}))
+        self.assertEqual({'k': 'v'}, fill_template_native({'k': 'v'}, {}))
+
+    # data structures and their templates are filled to python objects
+    def test_fill_template_object(self):
+        self.assertEqual([1, 'b'], fill_template_object(['{{ a }}', 'b'], {'a': 1}))
+        self.assertEqual([1, 2], fill_template_object('{{ a }}', {'a': '[1, 2]'}))
+        self.assertEqual([True, None], fill_template_object('{{ a }}', {'a': '[true, null]'}))
+
+    def test_format_ns(self):
+        self.assertEqual('0.300s', format_ns(300000000))
+        self.assertEqual('1m 5s', format_ns(65 * 10 ** 9))
+        self.assertEqual('2m 0s', format_ns(119.6 * 10 ** 9))  # seconds are rounded before splitting
+
+    # words, which are not variables or modules, are tried to be imported only once
+    def test_not_importable_names(self):
+        clear_import_cache()
+        body = {'name': 'John', 'status': 'active', 'id': '12', 'type': 'application/json', 'url': 'http://x/y'}
+        expected = {'name': 'John', 'status': 'active', 'id': 12, 'type': 'application/json', 'url': 'http://x/y'}
+        self.assertEqual(expected, fill_template_recursive(body, {}))
+        with patch('catcher.utils.module_utils.importlib.import_module') as imported:
+            self.assertEqual(expected, fill_template_recursive(body, {}))
+            self.assertEqual('active', fill_template('active', {}))
+        imported.assert_not_called()
+
+    # static body with bare words is filled without evaluation
+    def test_fill_static_words(self):
+        fill_template_recursive({'John': 'active'}, {})
+        with patch('catcher.utils.misc.eval', wraps=eval, create=True) as evaluated:
+            self.assertEqual({'John': 'active', 'id': 1}, fill_template_recursive({'John': 'active', 'id': '1'}, {}))
+        evaluated.assert_not_called()